@@ -1,6 +1,8 @@
 import pygame
 import numpy as np
 
+from tea import build_grid_mesh, visibility_polygon, points_in_polygon
+
 # Constants
 GRID_SIZE = 20
 GRID_WIDTH = 30
@@ -24,49 +26,18 @@ def create_grid():
 def is_point_in_polygon(x, y, polygon):
     """
     Checks if a point (x, y) is inside a polygon.
-    Uses the ray-casting algorithm.
+    Uses the ray-casting algorithm; see points_in_polygon for testing many points at once.
     """
-    n = len(polygon)
-    inside = False
-
-    px, py = polygon[0]
-    for i in range(n + 1):
-        p2x, p2y = polygon[i % n]
-        if y > min(py, p2y):
-            if y <= max(py, p2y):
-                if x <= max(px, p2x):
-                    if py != p2y:
-                        xinters = (y - py) * (p2x - px) / (p2y - py) + px
-                    if px == p2x or x <= xinters:
-                        inside = not inside
-        px, py = p2x, p2y
+    return bool(points_in_polygon([(x, y)], polygon)[0])
 
-    return inside
 
-
-def compute_visibility_polygon(grid, observer):
+def compute_visibility_polygon(mesh, observer):
     """
-    Computes the visibility polygon from the observer's position.
+    Computes the exact visibility polygon from the observer's position (the corner of its cell).
+    The polygon comes from the triangular expansion, with one vertex per wall or shadow ray corner.
     """
     ox, oy = observer
-    visibility_polygon = []
-
-    for angle in range(0, 360, 5):  # Check every 5 degrees
-        angle_rad = np.radians(angle)
-        dx = np.cos(angle_rad)
-        dy = np.sin(angle_rad)
-
-        for dist in range(1, max(GRID_WIDTH, GRID_HEIGHT) * GRID_SIZE):
-            x = ox * GRID_SIZE + dist * dx
-            y = oy * GRID_SIZE + dist * dy
-            grid_x, grid_y = int(x // GRID_SIZE), int(y // GRID_SIZE)
-
-            if 0 <= grid_x < GRID_WIDTH and 0 <= grid_y < GRID_HEIGHT:
-                if not grid[grid_x, grid_y]:  # Hit an obstacle
-                    break
-            visibility_polygon.append((x, y))
-
-    return visibility_polygon
+    return visibility_polygon(mesh, (ox * GRID_SIZE, oy * GRID_SIZE)).tolist()
 
 
 def draw_polygon(screen, polygon):
@@ -86,6 +57,7 @@ def main():
     pygame.display.set_caption('Raycast Grid Visibility 2')
     clock = pygame.time.Clock()
     grid = create_grid()
+    mesh = build_grid_mesh(grid, GRID_SIZE)
     running = True
     observer_pos = (GRID_WIDTH // 2, GRID_HEIGHT // 2)  # Initialize observer position
 
@@ -101,7 +73,7 @@ def main():
         screen.fill(BLACK)  # Clear the screen
 
         # Compute the visibility polygon
-        visibility_polygon = compute_visibility_polygon(grid, observer_pos)
+        polygon = compute_visibility_polygon(mesh, observer_pos)
 
         # Draw the grid
         for x in range(GRID_WIDTH):
@@ -113,7 +85,7 @@ def main():
                 pygame.draw.rect(screen, color, pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE))
 
         # Draw the visibility polygon
-        draw_polygon(screen, visibility_polygon)
+        draw_polygon(screen, polygon)
 
         # Highlight observer position
         pygame.draw.rect(screen, GREEN,
@@ -1,7 +1,6 @@
 import pygame
-import numpy as np
-import math
-from collections import deque
+
+from tea import create_grid, compute_visibility, shadowcast_visibility
 
 # Constants
 GRID_SIZE = 20
@@ -13,72 +12,8 @@ GRAY = (50, 50, 50)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 
-
-def create_grid():
-    """
-    Creates a grid with random True (walkable) and False (blocked) values.
-    """
-    grid = np.zeros((GRID_WIDTH, GRID_HEIGHT), dtype=bool)
-    grid[:, :] = np.random.choice([True, False], size=(GRID_WIDTH, GRID_HEIGHT), p=[0.7, 0.3])
-    return grid
-
-
-def is_visible(grid, observer, target):
-    """
-    Checks if the target cell is visible from the observer's position.
-    Uses a raycasting approach.
-    """
-    observer_x, observer_y = observer
-    target_x, target_y = target
-    dx, dy = target_x - observer_x, target_y - observer_y
-    steps = max(abs(dx), abs(dy))
-    if steps == 0:
-        return True
-
-    for i in range(steps):
-        t = i / steps
-        ix = int(observer_x + t * dx)
-        iy = int(observer_y + t * dy)
-
-        if ix < 0 or iy < 0 or ix >= GRID_WIDTH or iy >= GRID_HEIGHT:
-            return False
-
-        # If a wall (black square) is encountered, stop visibility and mark as a blocking wall
-        if not grid[ix, iy]:
-            if (ix, iy) == target:
-                return True  # The wall itself is visible
-            return False
-
-    return True
-
-
-def compute_visibility(grid, observer):
-    """
-    Computes visible cells using a BFS approach from the observer's position.
-    Returns both the visible cells and the blocking walls that are visible.
-    """
-    visible_cells = set()
-    visible_walls = set()
-    queue = deque([observer])
-    visited = set()
-
-    while queue:
-        x, y = queue.popleft()
-        if (x, y) in visited:
-            continue
-        visited.add((x, y))
-
-        if is_visible(grid, observer, (x, y)):
-            if grid[x, y]:
-                visible_cells.add((x, y))
-                # Check the 4 adjacent cells (up, down, left, right)
-                for nx, ny in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
-                    if 0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT:
-                        queue.append((nx, ny))
-            else:
-                visible_walls.add((x, y))
-
-    return visible_cells, visible_walls
+# Field of view algorithms; any key press switches to the next one
+FOV_MODES = [('shadowcast', shadowcast_visibility), ('raycast', compute_visibility)]
 
 
 def draw_grid(screen, grid, visible_walls):
@@ -113,10 +48,11 @@ def draw_observer(screen, observer_pos):
 def main():
     pygame.init()
     screen = pygame.display.set_mode((GRID_WIDTH * GRID_SIZE, GRID_HEIGHT * GRID_SIZE))
-    pygame.display.set_caption('Raycast Grid Visibility 3')
+    pygame.display.set_caption(f'Raycast Grid Visibility 3 ({FOV_MODES[0][0]})')
     clock = pygame.time.Clock()
-    grid = create_grid()
+    grid = create_grid(GRID_WIDTH, GRID_HEIGHT)
     observer_pos = (GRID_WIDTH // 2, GRID_HEIGHT // 2)
+    mode = 0
     visible_cells = set()
     visible_walls = set()
     running = True
@@ -127,7 +63,11 @@ def main():
             elif event.type == pygame.MOUSEMOTION:
                 mouse_x, mouse_y = event.pos
                 observer_pos = (mouse_x // GRID_SIZE, mouse_y // GRID_SIZE)
-                visible_cells, visible_walls = compute_visibility(grid, observer_pos)
+                visible_cells, visible_walls = FOV_MODES[mode][1](grid, observer_pos)
+            elif event.type == pygame.KEYDOWN:
+                mode = (mode + 1) % len(FOV_MODES)
+                pygame.display.set_caption(f'Raycast Grid Visibility 3 ({FOV_MODES[mode][0]})')
+                visible_cells, visible_walls = FOV_MODES[mode][1](grid, observer_pos)
 
         screen.fill(BLACK)
         draw_grid(screen, grid, visible_walls)
@@ -1,6 +1,8 @@
 import pygame
 import numpy as np
 
+from tea import build_triangle_neighbor_map, mesh_from_triangles, PointLocator, los
+
 # Constants
 GRID_SIZE = 20
 GRID_WIDTH = 30
@@ -46,10 +48,7 @@ def is_partially_visible(triangle, observer, grid):
     """
     Checks if at least one vertex of the triangle is visible from the observer's position.
     """
-    for point in triangle:
-        if is_visible(point, observer, grid):
-            return True
-    return False
+    return bool(los.batch_is_visible(observer, np.array(triangle, dtype=np.float64), grid, GRID_SIZE).any())
 
 
 def get_square_center(mouse_pos):
@@ -67,40 +66,14 @@ def is_visible(point, observer, grid, screen=None):
     """
     Checks if a point is visible from the center of the square the mouse is on.
     Draws a line from the observer to the point for debugging purposes, but only if the point is visible.
-    Blocks visibility if the line passes through the corner where two black squares meet.
+    The line of sight walks each crossed cell once and is blocked by a corner where two black squares meet.
     """
-    observer_x, observer_y = observer
-    px, py = point
-    dx, dy = px - observer_x, py - observer_y
-    steps = max(abs(dx), abs(dy))
-    if steps == 0:
-        return True
-
-    observer_grid_x = observer_x // GRID_SIZE
-    observer_grid_y = observer_y // GRID_SIZE
-
-    for i in range(steps):
-        t = i / steps
-        ix = int(observer_x + t * dx) // GRID_SIZE
-        iy = int(observer_y + t * dy) // GRID_SIZE
-
-        if ix < 0 or iy < 0 or ix >= GRID_WIDTH or iy >= GRID_HEIGHT or not grid[ix, iy]:
-            return False
-
-        # Check for diagonal blocking (corner case)
-        if ix != observer_grid_x and iy != observer_grid_y:
-            # If the line passes through a corner formed by two black squares, block visibility
-            if (not grid[ix, observer_grid_y] and not grid[observer_grid_x, iy]) or not grid[ix, iy]:
-                return False
-
-        # Additional check for corner passing
-        if ix != observer_grid_x and iy != observer_grid_y:
-            if not grid[observer_grid_x, iy] and not grid[ix, observer_grid_y]:
-                return False
+    if not los.is_visible(point, observer, grid, GRID_SIZE):
+        return False
 
     # Draw a line for visualization if the point is visible
     if screen is not None:
-        pygame.draw.line(screen, GREEN, (observer_x, observer_y), (px, py), 1)
+        pygame.draw.line(screen, GREEN, observer, point, 1)
 
     return True
 
@@ -112,33 +85,41 @@ def draw_triangles(screen, triangles, observer, grid):
     """
     observer_center = get_square_center(observer)
 
-    for triangle in triangles:
-        points = [(p[0], p[1]) for p in triangle]
-        visible = False
+    # Test every vertex of every triangle in one vectorized pass
+    points = np.array(triangles, dtype=np.float64).reshape(-1, 2)
+    vertex_visible = los.batch_is_visible(observer_center, points, grid, GRID_SIZE)
+    for point in points[vertex_visible]:
+        pygame.draw.line(screen, GREEN, observer_center, tuple(point), 1)
 
-        # Check visibility from the center of the observer's square
-        if is_visible(points[0], observer_center, grid, screen) or \
-                is_visible(points[1], observer_center, grid, screen) or \
-                is_visible(points[2], observer_center, grid, screen):
-            visible = True
+    for triangle, visible in zip(triangles, vertex_visible.reshape(-1, 3).any(axis=1)):
+        color = BLUE if visible else RED
+        pygame.draw.polygon(screen, color, triangle, 1)
 
-        if visible:
-            color = BLUE
-        else:
-            color = RED
 
-        pygame.draw.polygon(screen, color, points, 1)
+def is_triangle_visible(triangle, observer, grid, screen=None):
+    """
+    Determines if the triangle is visible from the observer's position, testing its three
+    vertices in one batch_is_visible call.
+    Draws lines from the observer to each visible vertex of the triangle for debugging.
+    """
+    vertex_visible = test_vertices(triangle, observer, grid, {}, screen)
+    return any(vertex_visible[point] for point in triangle)
 
 
-def is_triangle_visible(triangle, observer, grid, screen=None):
+def test_vertices(points, observer, grid, vertex_visible, screen=None):
     """
-    Determines if the triangle is visible from the observer's position.
-    Draws lines from the observer to each vertex of the triangle for debugging, but only if visible.
+    Adds the visibility of every point not yet in vertex_visible to it, testing them all
+    in one batch_is_visible call, and returns vertex_visible.
+    Draws a line from the observer to each newly tested visible point for debugging.
     """
-    for point in triangle:
-        if is_visible(point, observer, grid, screen):
-            return True
-    return False
+    untested = list(dict.fromkeys(point for point in points if point not in vertex_visible))
+    if untested:
+        visible = los.batch_is_visible(observer, np.array(untested, dtype=np.float64), grid, GRID_SIZE)
+        for point, point_visible in zip(untested, visible.tolist()):
+            vertex_visible[point] = point_visible
+            if point_visible and screen is not None:
+                pygame.draw.line(screen, GREEN, observer, point, 1)
+    return vertex_visible
 
 
 def triangulate_walkable_area(grid):
@@ -154,78 +135,45 @@ def triangulate_walkable_area(grid):
     return triangles
 
 
-def find_observer_triangle(observer_pos, triangles):
+def find_observer_triangle(observer_pos, triangles, locator):
     """
     Finds the triangle that contains the observer's position.
     """
-    for triangle in triangles:
-        if point_in_triangle(observer_pos, triangle):
-            return triangle
-    return None
+    index = locator.locate(observer_pos)
+    return triangles[index] if index is not None else None
 
 
-def recursive_visibility_expansion(observer_pos, triangle, triangles, visible_triangles, grid, screen=None):
+def visibility_expansion(observer_pos, triangle, neighbor_map, visible_triangles, grid, screen=None):
     """
-    Recursively expands visibility from the current triangle.
+    Expands visibility from the observer's triangle one frontier at a time, so large maps
+    do not run into the recursion limit. The shared-edge end points of a whole frontier
+    are tested in one batch_is_visible call and every vertex is tested once per query.
+    visible_triangles doubles as the visited set.
     """
-    if triangle in visible_triangles:
-        return
+    vertex_visible = {}
     visible_triangles.add(triangle)
-
-    # Find neighboring triangles that share an edge
-    for neighbor in find_neighbors(triangle, triangles):
-        if is_visible_from_triangle(observer_pos, neighbor, triangle, grid, screen):
-            recursive_visibility_expansion(observer_pos, neighbor, triangles, visible_triangles, grid, screen)
-
-
-def is_visible_from_triangle(observer_pos, neighbor, current_triangle, grid, screen=None):
+    frontier = [triangle]
+    while frontier:
+        # Find neighboring triangles that share an edge
+        candidates = [(neighbor, current) for current in frontier for neighbor in neighbor_map[current]
+                      if neighbor not in visible_triangles]
+        test_vertices([point for neighbor, current in candidates for point in neighbor if point in current],
+                      observer_pos, grid, vertex_visible, screen)
+        frontier = []
+        for neighbor, current in candidates:
+            if neighbor not in visible_triangles and is_visible_from_triangle(neighbor, current, vertex_visible):
+                visible_triangles.add(neighbor)
+                frontier.append(neighbor)
+
+
+def is_visible_from_triangle(neighbor, current_triangle, vertex_visible):
     """
     Determines if a neighboring triangle is visible from the current triangle.
-    Checks if the shared edge is visible from the observer's position.
+    Checks if both end points of the shared edge are visible from the observer's
+    position, looking them up in the vertex_visible map filled by test_vertices.
     """
     shared_edge = tuple(set(current_triangle) & set(neighbor))
-    if len(shared_edge) == 2:
-        if is_visible(shared_edge[0], observer_pos, grid, screen) and is_visible(shared_edge[1], observer_pos, grid,
-                                                                                 screen):
-            return True
-    return False
-
-
-def find_neighbors(triangle, triangles):
-    """
-    Finds all triangles that share an edge with the given triangle.
-    """
-    neighbors = []
-    for other in triangles:
-        if other != triangle and shares_edge(triangle, other):
-            neighbors.append(other)
-    return neighbors
-
-
-def shares_edge(triangle1, triangle2):
-    """
-    Determines if two triangles share an edge.
-    """
-    shared_points = set(triangle1) & set(triangle2)
-    return len(shared_points) == 2
-
-
-def point_in_triangle(point, triangle):
-    """
-    Checks if a point is inside a triangle using barycentric coordinates.
-    """
-
-    def sign(p1, p2, p3):
-        return (p1[0] - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (p1[1] - p3[1])
-
-    d1 = sign(point, triangle[0], triangle[1])
-    d2 = sign(point, triangle[1], triangle[2])
-    d3 = sign(point, triangle[2], triangle[0])
-
-    has_neg = (d1 < 0) or (d2 < 0) or (d3 < 0)
-    has_pos = (d1 > 0) or (d2 > 0) or (d3 > 0)
-
-    return not (has_neg and has_pos)
+    return len(shared_edge) == 2 and vertex_visible[shared_edge[0]] and vertex_visible[shared_edge[1]]
 
 
 def draw_grid(screen, grid):
@@ -258,6 +206,8 @@ def main():
     clock = pygame.time.Clock()
     grid = create_grid()
     triangles = triangulate_walkable_area(grid)
+    neighbor_map = build_triangle_neighbor_map(triangles)
+    locator = PointLocator(mesh_from_triangles(triangles))
     # observer_pos = (GRID_WIDTH // 2 * GRID_SIZE, GRID_HEIGHT // 2 * GRID_SIZE)
     visible_triangles = set()
 
@@ -270,10 +220,10 @@ def main():
             elif event.type == pygame.MOUSEMOTION:
                 observer_pos = event.pos
                 visible_triangles.clear()
-                observer_triangle = find_observer_triangle(observer_pos, triangles)
+                observer_triangle = find_observer_triangle(observer_pos, triangles, locator)
                 if observer_triangle:
-                    recursive_visibility_expansion(observer_pos, observer_triangle, triangles, visible_triangles, grid,
-                                                   screen)
+                    visibility_expansion(observer_pos, observer_triangle, neighbor_map, visible_triangles,
+                                         grid, screen)
 
         screen.fill(BLACK)
         draw_grid(screen, grid)
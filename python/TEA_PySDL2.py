@@ -3,6 +3,8 @@ import sdl2.ext
 import numpy as np
 import math
 
+from tea import build_triangle_neighbor_map, mesh_from_triangles, PointLocator, los
+
 # Constants
 GRID_SIZE = 20
 GRID_WIDTH = 30
@@ -37,26 +39,7 @@ def triangulate_polygon(polygon):
 
 # Visibility Functions
 def is_visible(point, observer, grid):
-    observer_x, observer_y = observer
-    px, py = point
-    dx, dy = px - observer_x, py - observer_y
-    steps = max(abs(dx), abs(dy))
-    if steps == 0:
-        return True
-
-    for i in range(steps):
-        t = i / steps
-        ix = int(observer_x + t * dx) // GRID_SIZE
-        iy = int(observer_y + t * dy) // GRID_SIZE
-
-        if ix < 0 or iy < 0 or ix >= GRID_WIDTH or iy >= GRID_HEIGHT or not grid[ix, iy]:
-            return False
-
-        if ix != observer_x // GRID_SIZE and iy != observer_y // GRID_SIZE:
-            if (not grid[ix, observer_y // GRID_SIZE] and not grid[observer_x // GRID_SIZE, iy]) or not grid[ix, iy]:
-                return False
-
-    return True
+    return los.is_visible(point, observer, grid, GRID_SIZE)
 
 
 def triangulate_walkable_area(grid):
@@ -69,48 +52,25 @@ def triangulate_walkable_area(grid):
     return triangles
 
 
-def find_observer_triangle(observer_pos, triangles):
-    for triangle in triangles:
-        if point_in_triangle(observer_pos, triangle):
-            return triangle
-    return None
-
-
-def point_in_triangle(point, triangle):
-    def sign(p1, p2, p3):
-        return (p1[0] - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (p1[1] - p3[1])
-
-    d1 = sign(point, triangle[0], triangle[1])
-    d2 = sign(point, triangle[1], triangle[2])
-    d3 = sign(point, triangle[2], triangle[0])
-
-    has_neg = (d1 < 0) or (d2 < 0) or (d3 < 0)
-    has_pos = (d1 > 0) or (d2 > 0) or (d3 > 0)
-
-    return not (has_neg and has_pos)
-
-
-def recursive_visibility_expansion(observer_pos, triangle, triangles, visible_triangles, grid):
-    if triangle in visible_triangles:
-        return
-    visible_triangles.add(triangle)
-
-    for neighbor in find_neighbors(triangle, triangles):
-        if is_visible_from_triangle(observer_pos, neighbor, triangle, grid):
-            recursive_visibility_expansion(observer_pos, neighbor, triangles, visible_triangles, grid)
-
+def find_observer_triangle(observer_pos, triangles, locator):
+    index = locator.locate(observer_pos)
+    return triangles[index] if index is not None else None
 
-def find_neighbors(triangle, triangles):
-    neighbors = []
-    for other in triangles:
-        if other != triangle and shares_edge(triangle, other):
-            neighbors.append(other)
-    return neighbors
 
+def visibility_expansion(observer_pos, triangle, neighbor_map, visible_triangles, grid):
+    # An explicit stack instead of recursion, so large maps do not hit the recursion limit
+    stack = [triangle]
+    while stack:
+        triangle = stack.pop()
+        if triangle in visible_triangles:
+            continue
+        visible_triangles.add(triangle)
 
-def shares_edge(triangle1, triangle2):
-    shared_points = set(triangle1) & set(triangle2)
-    return len(shared_points) == 2
+        # Find neighboring triangles that share an edge
+        for neighbor in neighbor_map[triangle]:
+            if neighbor not in visible_triangles and \
+                    is_visible_from_triangle(observer_pos, neighbor, triangle, grid):
+                stack.append(neighbor)
 
 
 def is_visible_from_triangle(observer_pos, neighbor, current_triangle, grid):
@@ -157,6 +117,8 @@ def main():
 
     grid = create_grid()
     triangles = triangulate_walkable_area(grid)
+    neighbor_map = build_triangle_neighbor_map(triangles)
+    locator = PointLocator(mesh_from_triangles(triangles))
     visible_triangles = set()
 
     running = True
@@ -169,9 +131,10 @@ def main():
             elif event.type == sdl2.SDL_MOUSEMOTION:
                 observer_pos = event.motion.x, event.motion.y
                 visible_triangles.clear()
-                observer_triangle = find_observer_triangle(observer_pos, triangles)
+                observer_triangle = find_observer_triangle(observer_pos, triangles, locator)
                 if observer_triangle:
-                    recursive_visibility_expansion(observer_pos, observer_triangle, triangles, visible_triangles, grid)
+                    visibility_expansion(observer_pos, observer_triangle, neighbor_map, visible_triangles,
+                                         grid)
 
         sdl2.SDL_SetRenderDrawColor(renderer, BLACK.r, BLACK.g, BLACK.b, BLACK.a)
         sdl2.SDL_RenderClear(renderer)
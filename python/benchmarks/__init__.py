@@ -0,0 +1,10 @@
+"""
+Headless benchmarks for every visibility implementation in the tea package.
+
+Run from the python directory:
+
+    python -m benchmarks --sizes 32 64 128 --densities 0.1 0.3 --output results.json
+
+Every implementation is timed on the same seeded maps, one query at a time and
+without any drawing, and the results are written as JSON so runs can be diffed.
+"""
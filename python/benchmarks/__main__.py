@@ -0,0 +1,121 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from tea import generate_map, QueryStats
+
+from .cases import IMPLEMENTATIONS
+
+# Queries traced for peak memory; tracing slows Python down, so it runs apart from the timed loop
+MEMORY_QUERIES = 10
+
+
+def run_case(name, style, size, density, seed, queries, time_budget):
+    """
+    Builds the map and the implementation's structures, then times queries one by one
+    until all are done or time_budget seconds have passed (at least a few always run).
+    Returns the result record of the case.
+    """
+    family, setup = IMPLEMENTATIONS[name]
+    grid = generate_map(style, size, size, seed=seed, density=density)
+
+    started = time.perf_counter()
+    query, observers, info = setup(grid, queries, seed)
+    setup_seconds = time.perf_counter() - started
+
+    latencies = []
+    deadline = time.perf_counter() + time_budget
+    for observer in observers:
+        started = time.perf_counter()
+        query(observer)
+        latencies.append(time.perf_counter() - started)
+        if len(latencies) >= 3 and time.perf_counter() > deadline:
+            break
+
+    # Counted in a second pass over the timed observers so the counters do not slow the timed loop
+    popped = []
+    for observer in observers[:len(latencies)]:
+        stats = QueryStats()
+        query(observer, stats)
+        popped.append(stats.triangles_popped)
+
+    tracemalloc.start()
+    peak = 0
+    for observer in observers[:MEMORY_QUERIES]:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        query(observer)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    latencies = np.array(latencies) * 1000
+    return dict(
+        implementation=name,
+        family=family,
+        style=style,
+        size=size,
+        density=density,
+        seed=seed,
+        setup_seconds=round(setup_seconds, 4),
+        queries=len(latencies),
+        queries_per_second=round(len(latencies) / (latencies.sum() / 1000), 2),
+        latency_ms=dict(p50=round(float(np.percentile(latencies, 50)), 4),
+                        p99=round(float(np.percentile(latencies, 99)), 4),
+                        mean=round(float(latencies.mean()), 4)),
+        triangles_popped_mean=round(float(np.mean(popped)), 2),
+        peak_query_memory_kib=round(peak / 1024, 1),
+        **info,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    parser.add_argument('--implementations', nargs='+', default=list(IMPLEMENTATIONS), choices=list(IMPLEMENTATIONS))
+    parser.add_argument('--styles', nargs='+', default=['noise'], choices=['noise', 'cave'],
+                        help='map generators; both take the density as their wall fraction')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[32, 64, 128],
+                        help='map side lengths in cells')
+    parser.add_argument('--densities', nargs='+', type=float, default=[0.1, 0.3],
+                        help='fractions of blocked cells')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=200, help='queries per case')
+    parser.add_argument('--time-budget', type=float, default=5.0,
+                        help='seconds after which a case stops issuing queries')
+    parser.add_argument('--output', help='write the JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = []
+    for style in args.styles:
+        for size in args.sizes:
+            for density in args.densities:
+                for name in args.implementations:
+                    record = run_case(name, style, size, density, args.seed, args.queries, args.time_budget)
+                    results.append(record)
+                    print(f"{name:>15} {style} size={size:<5} density={density:<5} "
+                          f"{record['queries_per_second']:>10} q/s  "
+                          f"p50={record['latency_ms']['p50']} ms  p99={record['latency_ms']['p99']} ms",
+                          file=sys.stderr)
+
+    report = dict(
+        python=platform.python_version(),
+        numpy=np.__version__,
+        machine=platform.machine(),
+        platform=platform.platform(),
+        arguments=vars(args),
+        results=results,
+    )
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
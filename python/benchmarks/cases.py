@@ -0,0 +1,201 @@
+import math
+
+import numpy as np
+
+from tea import (
+    build_grid_mesh,
+    mesh_from_triangles,
+    triangular_expansion_cdt,
+    edge_visibility_expansion,
+    visibility_polygon,
+    TiledGridMesh,
+    compute_visibility,
+    shadowcast_visibility,
+    triangles_from_grid,
+    grid_level_mesh,
+    mesh_d_TEA,
+    generate_level,
+    assign_neighbors,
+    build_triangle_locator,
+    find_containing_triangle,
+    d_TEA,
+    ObstacleIndex,
+)
+
+CELL_SIZE = 10
+
+# d-TEA queries see this many cells far
+DTEA_RANGE_CELLS = 20
+
+# Half-angle of the view cone of the *_cone cases: a 90 degree field of view
+CONE_HALF_ANGLE = math.pi / 4
+
+
+def grid_observers(grid, count, seed):
+    """
+    Returns count random observer positions in pixels, each inside a walkable cell.
+    """
+    rng = np.random.default_rng(seed)
+    cells = np.argwhere(grid)
+    chosen = cells[rng.integers(len(cells), size=count)]
+    return ((chosen + rng.uniform(0.05, 0.95, size=(count, 2))) * CELL_SIZE).tolist()
+
+
+def cone_observers(observers, seed):
+    """
+    Gives every observer a random heading in radians as a third coordinate.
+    """
+    headings = np.random.default_rng(seed).uniform(-math.pi, math.pi, size=len(observers))
+    return [observer + [heading] for observer, heading in zip(observers, headings.tolist())]
+
+
+def cell_triangles(grid):
+    """
+    Splits every walkable cell into two triangles, the mesh the Simplified TEA demos use.
+    """
+    cells = np.argwhere(grid).astype(np.float64) * CELL_SIZE
+    x, y = cells[:, :1], cells[:, 1:]
+    corners = np.stack([np.hstack([x, y]), np.hstack([x + CELL_SIZE, y]), np.hstack([x + CELL_SIZE, y + CELL_SIZE]),
+                        np.hstack([x, y + CELL_SIZE])], axis=1)
+    return np.concatenate([corners[:, [0, 1, 2]], corners[:, [0, 2, 3]]]).tolist()
+
+
+def setup_tea(grid, count, seed):
+    mesh = build_grid_mesh(grid, CELL_SIZE)
+
+    def query(observer, stats=None):
+        triangular_expansion_cdt(mesh, observer, stats)
+    return query, grid_observers(grid, count, seed), dict(triangles=len(mesh))
+
+
+def setup_tea_tiled(grid, count, seed):
+    tiled = TiledGridMesh(grid, CELL_SIZE)
+
+    def query(observer, stats=None):
+        triangular_expansion_cdt(tiled.mesh, observer, stats)
+    return query, grid_observers(grid, count, seed), dict(triangles=int(tiled.mesh.walkable.sum()))
+
+
+def setup_tea_cone(grid, count, seed):
+    mesh = build_grid_mesh(grid, CELL_SIZE)
+
+    def query(observer, stats=None):
+        x, y, heading = observer
+        triangular_expansion_cdt(mesh, (x, y), stats, heading=heading, half_angle=CONE_HALF_ANGLE)
+    return query, cone_observers(grid_observers(grid, count, seed), seed), dict(triangles=len(mesh))
+
+
+def setup_tea_polygon(grid, count, seed):
+    mesh = build_grid_mesh(grid, CELL_SIZE)
+
+    def query(observer, stats=None):
+        visibility_polygon(mesh, observer, stats=stats)
+    return query, grid_observers(grid, count, seed), dict(triangles=len(mesh))
+
+
+def setup_simplified_tea(grid, count, seed):
+    mesh = mesh_from_triangles(cell_triangles(grid))
+
+    def query(observer, stats=None):
+        edge_visibility_expansion(mesh, observer, grid, CELL_SIZE, stats)
+    return query, grid_observers(grid, count, seed), dict(triangles=len(mesh))
+
+
+def setup_raycast_bfs(grid, count, seed):
+    def query(observer, stats=None):
+        compute_visibility(grid, (int(observer[0] // CELL_SIZE), int(observer[1] // CELL_SIZE)), stats)
+    return query, grid_observers(grid, count, seed), dict(cells=grid.size)
+
+
+def setup_shadowcast(grid, count, seed):
+    def query(observer, stats=None):
+        shadowcast_visibility(grid, (int(observer[0] // CELL_SIZE), int(observer[1] // CELL_SIZE)), stats)
+    return query, grid_observers(grid, count, seed), dict(cells=grid.size)
+
+
+def level_observers(triangles, count, seed):
+    """
+    Returns count random points spread uniformly over the non-obstacle triangles of a d-TEA level.
+    """
+    rng = np.random.default_rng(seed)
+    corners = np.array([tri.vertices for tri in triangles if not tri.is_obstacle], dtype=np.float64)
+    ab, ac = corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    areas = np.abs(ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0])
+    chosen = corners[rng.choice(len(corners), size=count, p=areas / areas.sum())]
+    # Uniform barycentric weights, kept off the edges
+    a, b = rng.uniform(0.05, 0.95, size=(2, count, 1))
+    flip = a + b > 1
+    a, b = np.where(flip, 1 - a, a), np.where(flip, 1 - b, b)
+    return (chosen[:, 0] + a * (chosen[:, 1] - chosen[:, 0]) + b * (chosen[:, 2] - chosen[:, 0])).tolist()
+
+
+def dtea_query(triangles, obstacle_index):
+    locator = build_triangle_locator(triangles)
+    visited = np.zeros(len(triangles), dtype=bool)
+
+    def query(observer, stats=None):
+        triangle = find_containing_triangle(triangles, observer, locator, stats)
+        if triangle is not None:
+            d_TEA(triangle, observer, DTEA_RANGE_CELLS * CELL_SIZE, visited, obstacle_index=obstacle_index, stats=stats)
+    return query
+
+
+def setup_dtea_grid(grid, count, seed):
+    triangles, holes, hole_boxes = triangles_from_grid(grid, CELL_SIZE)
+    assign_neighbors(triangles)
+    return dtea_query(triangles, ObstacleIndex(holes, hole_boxes)), level_observers(triangles, count, seed), \
+        dict(triangles=len(triangles), holes=len(holes))
+
+
+def setup_dtea_mesh(grid, count, seed):
+    mesh, holes, hole_boxes = grid_level_mesh(grid, CELL_SIZE)
+    obstacle_index = ObstacleIndex(holes, hole_boxes)
+    locator = mesh.point_locator()
+    visited = np.zeros(len(mesh), dtype=bool)
+
+    def query(observer, stats=None):
+        mesh_d_TEA(mesh, locator.locate(observer), observer, DTEA_RANGE_CELLS * CELL_SIZE, visited, obstacle_index,
+                   stats)
+    return query, grid_observers(grid, count, seed), dict(triangles=len(mesh), holes=len(holes))
+
+
+def setup_dtea_mesh_cone(grid, count, seed):
+    mesh, holes, hole_boxes = grid_level_mesh(grid, CELL_SIZE)
+    obstacle_index = ObstacleIndex(holes, hole_boxes)
+    locator = mesh.point_locator()
+    visited = np.zeros(len(mesh), dtype=bool)
+
+    def query(observer, stats=None):
+        x, y, heading = observer
+        mesh_d_TEA(mesh, locator.locate((x, y)), (x, y), DTEA_RANGE_CELLS * CELL_SIZE, visited, obstacle_index,
+                   stats, heading=heading, half_angle=CONE_HALF_ANGLE)
+    return query, cone_observers(grid_observers(grid, count, seed), seed), \
+        dict(triangles=len(mesh), holes=len(holes))
+
+
+def setup_dtea_holes(grid, count, seed):
+    width, height = grid.shape
+    # Holes cover roughly 100 cells each; as many as the map's blocked area
+    holes_count = max(1, round((1 - grid.mean()) * grid.size / 100))
+    triangles, holes = generate_level(width * CELL_SIZE, height * CELL_SIZE, holes_count, seed=seed)
+    assign_neighbors(triangles)
+    return dtea_query(triangles, ObstacleIndex(holes)), level_observers(triangles, count, seed), \
+        dict(triangles=len(triangles), holes=len(holes))
+
+
+# name -> (family, setup). setup(grid, count, seed) returns (query, observers, info):
+# query(observer, stats=None) runs one visibility query and fills in the QueryStats given
+# as stats, observers holds count positions in pixels to query from.
+IMPLEMENTATIONS = {
+    'tea': ('Basic_TEA', setup_tea),
+    'tea_tiled': ('Basic_TEA', setup_tea_tiled),
+    'tea_cone': ('Basic_TEA', setup_tea_cone),
+    'tea_polygon': ('Basic_TEA', setup_tea_polygon),
+    'simplified_tea': ('Simplified_TEA', setup_simplified_tea),
+    'dtea_grid': ('dTEA', setup_dtea_grid),
+    'dtea_mesh': ('dTEA', setup_dtea_mesh),
+    'dtea_mesh_cone': ('dTEA', setup_dtea_mesh_cone),
+    'dtea_holes': ('dTEA', setup_dtea_holes),
+    'raycast_bfs': ('Raycast', setup_raycast_bfs),
+    'shadowcast': ('Raycast', setup_shadowcast),
+}
@@ -0,0 +1,98 @@
+"""
+Headless core of the Triangular Expansion Algorithm (TEA) experiments.
+
+Everything in this package is pure computation (mesh building, point location,
+visibility expansion and line of sight) and never imports pygame or SDL, so it
+can be used from servers and tools that have no display. The demo scripts next
+to this package are thin front-ends over it.
+"""
+from .grid import create_grid, get_square_center
+from .geometry import (
+    orient,
+    ray_hit,
+    clip_edge_to_window,
+    segment_closest_point,
+    segment_distance_squared,
+    view_cone_wedges,
+    check_view_cone,
+    clip_segment_to_wedge,
+    clip_segment_to_cone,
+)
+from .mesh import (
+    FLAG_OBSTACLE,
+    FLAG_CONSTRAINED_EDGE,
+    Mesh,
+    build_neighbor_array,
+    mesh_from_triangles,
+    build_grid_mesh,
+    trace_wall_segments,
+    triangulate_grid_with_cdt,
+    classify_walkable_triangles,
+    build_triangle_neighbor_map,
+)
+from .locate import is_point_in_triangle, PointLocator, find_observer_triangle
+from .los import first_blocking_cell, is_visible, is_triangle_visible, batch_is_visible
+from .expansion import (
+    nudge_observer,
+    iterative_visibility_expansion,
+    triangular_expansion_cdt,
+    edge_visibility_expansion,
+)
+from .raycast import is_cell_visible, compute_visibility
+from .dtea import (
+    Triangle,
+    random_polygon,
+    triangulate_polygon_with_holes,
+    triangulate_with_holes,
+    triangulate_mesh_with_holes,
+    random_level_holes,
+    generate_random_level_with_holes,
+    generate_grid,
+    triangles_from_grid,
+    grid_level_mesh,
+    bounding_box,
+    box_intersects_line,
+    line_intersects_triangle,
+    assign_neighbors,
+    build_triangle_locator,
+    find_containing_triangle,
+    cone_edge_targets,
+    d_TEA,
+    mesh_d_TEA,
+)
+from .obstacles import ObstacleIndex
+from .segments import SEGMENT_BLOCK, segment_edge_crossings, ObstacleEdges
+from .cache import (
+    MESH_CACHE_VERSION,
+    grid_mesh_key,
+    mesh_arrays,
+    mesh_from_arrays,
+    save_mesh,
+    load_mesh,
+    cached_grid_mesh,
+)
+from .batch import VISIBILITY_MODES, QueryWorkspace, VisibilityPool, visibility_many
+from .tiles import TiledGridMesh, TiledPointLocator
+from .pvs import PotentiallyVisibleSet, pack_rows, pvs_rows, pvs_key, build_pvs, load_pvs
+from .visibility_cache import VisibilityCache, cached_compute_visibility, cached_tiled_visibility
+from .shadowcast import shadowcast_visibility
+from .permissive import permissive_visibility
+from .polygon import ARC_STEP, visibility_polygon, circle_arc, clip_polygon_to_circle, clip_triangles_to_circle
+from .containment import (
+    triangle_contains,
+    points_in_triangles,
+    containing_triangle,
+    points_in_polygon,
+    points_in_visible_triangles,
+)
+from .stats import QUERY_COUNTERS, QUERY_PHASES, QueryStats, Histogram, StatsHistograms
+from .maps import (
+    MAP_STYLES,
+    noise_grid,
+    cave_grid,
+    room_grid,
+    corridor_grid,
+    generate_map,
+    hole_polygons,
+    generate_level,
+)
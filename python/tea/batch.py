@@ -0,0 +1,209 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .cache import mesh_arrays, mesh_from_arrays
+from .dtea import mesh_d_TEA
+from .expansion import triangular_expansion_cdt
+
+
+class QueryWorkspace:
+    """
+    The scratch state of one process running batch queries on a mesh: the visited
+    array mesh_d_TEA marks and clears again during every query, and the obstacle index
+    its sight lines are tested against (None for no obstacles). Every pool worker
+    builds its own, so no state is shared between processes.
+    """
+
+    def __init__(self, mesh, obstacle_index=None):
+        self.visited = np.zeros(len(mesh), dtype=bool)
+        self.obstacle_index = obstacle_index
+
+
+def tea_query(mesh, observer, visibility_range, workspace):
+    """
+    The 'tea' mode: triangular_expansion_cdt, limited to visibility_range if given.
+    """
+    return triangular_expansion_cdt(mesh, observer, visibility_range=visibility_range)
+
+
+def dtea_query(mesh, observer, visibility_range, workspace):
+    """
+    The 'dtea' mode: locates the observer and runs mesh_d_TEA with the workspace's
+    visited array and obstacle index.
+    """
+    triangle_index = mesh.point_locator().locate(observer)
+    return mesh_d_TEA(mesh, triangle_index, observer, visibility_range, workspace.visited,
+                      workspace.obstacle_index)
+
+
+# Query functions by mode name; each takes (mesh, observer, visibility_range, workspace)
+# and returns triangle indices
+VISIBILITY_MODES = {
+    'tea': tea_query,
+    'dtea': dtea_query,
+}
+
+# Modes that cannot run without a visibility_range
+RANGED_MODES = {'dtea'}
+
+# Byte alignment of the arrays packed into the shared memory block
+SHARED_ALIGNMENT = 64
+
+# Set in every worker process by _attach_worker
+_worker_mesh = None
+_worker_memory = None
+_worker_workspace = None
+
+
+def share_arrays(arrays):
+    """
+    Copies the arrays into one new SharedMemory block.
+    Returns the block and the layout {name: (offset, dtype, shape)} needed to view them again.
+    """
+    layout = {}
+    size = 0
+    for name, array in arrays.items():
+        size = -(-size // SHARED_ALIGNMENT) * SHARED_ALIGNMENT
+        layout[name] = (size, array.dtype.str, array.shape)
+        size += array.nbytes
+
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for name, view in view_arrays(memory, layout).items():
+        view[...] = arrays[name]
+    return memory, layout
+
+
+def view_arrays(memory, layout):
+    """
+    Returns NumPy views of the arrays described by layout inside the SharedMemory block.
+    """
+    return {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+            for name, (offset, dtype, shape) in layout.items()}
+
+
+def _attach_worker(memory_name, layout, obstacle_index):
+    """
+    Maps the shared block in a new worker and gives it its own QueryWorkspace. Queries
+    read the block through the mesh's flat views, so no worker keeps a private copy of
+    the mesh.
+    """
+    global _worker_mesh, _worker_memory, _worker_workspace
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    _worker_mesh = mesh_from_arrays(view_arrays(_worker_memory, layout))
+    _worker_mesh.flat_views()
+    _worker_workspace = QueryWorkspace(_worker_mesh, obstacle_index)
+
+
+def check_mode(mode, visibility_range):
+    """
+    Raises ValueError for an unknown mode or a ranged mode without a visibility_range.
+    """
+    if mode not in VISIBILITY_MODES:
+        raise ValueError(f'unknown visibility mode {mode!r}, expected one of {sorted(VISIBILITY_MODES)}')
+    if mode in RANGED_MODES and visibility_range is None:
+        raise ValueError(f'visibility mode {mode!r} needs a visibility_range')
+
+
+def visibility_chunk(mesh, observers, mode, visibility_range=None, workspace=None):
+    """
+    Runs the visibility query of the given mode for every observer, reusing the
+    workspace (a new one without obstacles if none is given).
+    Returns (counts, indices): the number of visible triangles per observer and all of
+    their indices concatenated, both int32.
+    """
+    query = VISIBILITY_MODES[mode]
+    if workspace is None:
+        workspace = QueryWorkspace(mesh)
+    results = [query(mesh, tuple(observer), visibility_range, workspace) for observer in observers.tolist()]
+    counts = np.fromiter((len(result) for result in results), dtype=np.int32, count=len(results))
+    indices = np.fromiter((index for result in results for index in result), dtype=np.int32, count=int(counts.sum()))
+    return counts, indices
+
+
+def _worker_chunk(observers, mode, visibility_range):
+    return visibility_chunk(_worker_mesh, observers, mode, visibility_range, _worker_workspace)
+
+
+def split_results(counts, indices):
+    """
+    Splits concatenated indices into one int32 array (a view) per observer.
+    """
+    return np.split(indices, np.cumsum(counts)[:-1]) if len(counts) else []
+
+
+class VisibilityPool:
+    """
+    Process pool answering visibility queries for many observers against one mesh.
+
+    The mesh arrays are copied once into a multiprocessing.shared_memory block that
+    every worker maps and queries in place, so the mesh is in memory once and starting
+    a query only ships the observer coordinates; the answers come back as int32 index
+    arrays. Keep the pool for as long as the mesh is unchanged (for example for every
+    tick of a level) and close it afterwards; it can be used as a context manager.
+
+    An obstacle_index (an ObstacleIndex or ObstacleEdges) is pickled to every worker
+    once, for the sight line tests of the 'dtea' mode; each worker also allocates its
+    own visited array (see QueryWorkspace).
+    """
+
+    def __init__(self, mesh, workers=None, obstacle_index=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.memory, layout = share_arrays(mesh_arrays(mesh))
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_attach_worker,
+                                            initargs=(self.memory.name, layout, obstacle_index))
+
+    def query(self, observers, mode='tea', chunk_size=None, visibility_range=None):
+        """
+        Returns one int32 array of visible triangle indices per observer, in input order.
+        The 'dtea' mode needs a visibility_range; 'tea' is limited to it if one is given.
+        """
+        check_mode(mode, visibility_range)
+        observers = np.asarray(observers, dtype=np.float64).reshape(-1, 2)
+        if chunk_size is None:
+            # A few chunks per worker keeps them all busy when query costs vary
+            chunk_size = max(1, math.ceil(len(observers) / (self.workers * 4)))
+
+        chunks = [observers[i:i + chunk_size] for i in range(0, len(observers), chunk_size)]
+        results = list(self.executor.map(_worker_chunk, chunks, [mode] * len(chunks),
+                                         [visibility_range] * len(chunks)))
+        if not results:
+            return []
+        counts = np.concatenate([counts for counts, _ in results])
+        indices = np.concatenate([indices for _, indices in results])
+        return split_results(counts, indices)
+
+    def close(self):
+        """
+        Shuts the workers down and releases the shared memory block.
+        """
+        self.executor.shutdown()
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def visibility_many(mesh, observers, mode='tea', workers=None, chunk_size=None, visibility_range=None,
+                    obstacle_index=None):
+    """
+    Computes the visible triangles of every observer and returns one int32 index array
+    per observer. mode is 'tea' (triangular_expansion_cdt) or 'dtea' (mesh_d_TEA, which
+    needs a visibility_range and tests its sight lines against obstacle_index if one is
+    given). With workers=1 the queries run in this process; otherwise a VisibilityPool
+    with that many workers (default: one per CPU) is created for the call.
+    """
+    check_mode(mode, visibility_range)
+    observers = np.asarray(observers, dtype=np.float64).reshape(-1, 2)
+    if workers == 1:
+        return split_results(*visibility_chunk(mesh, observers, mode, visibility_range,
+                                               QueryWorkspace(mesh, obstacle_index)))
+    with VisibilityPool(mesh, workers, obstacle_index) as pool:
+        return pool.query(observers, mode, chunk_size, visibility_range)
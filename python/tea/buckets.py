@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+
+
+class BucketGrid:
+    """
+    Uniform grid of square buckets over a set of axis-aligned boxes.
+
+    Every box is listed in each bucket its (optionally padded) extent overlaps. The
+    lists are stored as CSR arrays: the items of bucket b are
+    `items[start[b]:start[b + 1]]`, and buckets are numbered `by * nx + bx`.
+    """
+
+    def __init__(self, lower, upper, bucket_size=None, padding=0.0):
+        lower = np.asarray(lower, dtype=np.float64).reshape(-1, 2) - padding
+        upper = np.asarray(upper, dtype=np.float64).reshape(-1, 2) + padding
+        if len(lower):
+            self.origin = lower.min(axis=0)
+            extent = upper.max(axis=0) - self.origin
+        else:
+            self.origin = np.zeros(2)
+            extent = np.ones(2)
+        if bucket_size is None:
+            bucket_size = math.sqrt(max(extent[0] * extent[1], 1e-12) / max(len(lower), 1))
+        self.bucket_size = float(bucket_size)
+        self.nx, self.ny = (int(n) for n in np.maximum(np.ceil(extent / self.bucket_size), 1))
+        self.start, self.items = self._build(lower, upper)
+
+    @classmethod
+    def from_arrays(cls, origin, bucket_size, shape, start, items):
+        """
+        Rebuilds a BucketGrid from the arrays of an existing one (for example loaded
+        from disk) without distributing the boxes again.
+        """
+        buckets = cls.__new__(cls)
+        buckets.origin = np.array(origin, dtype=np.float64)
+        buckets.bucket_size = float(bucket_size)
+        buckets.nx, buckets.ny = (int(n) for n in shape)
+        buckets.start = start
+        buckets.items = items
+        return buckets
+
+    def _cells(self, points):
+        cells = np.floor((points - self.origin) / self.bucket_size).astype(np.int64)
+        return np.clip(cells, 0, [self.nx - 1, self.ny - 1])
+
+    def _build(self, lower, upper):
+        low = self._cells(lower)
+        spans = self._cells(upper) - low + 1
+        counts = spans[:, 0] * spans[:, 1]
+
+        item_ids = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        widths = np.repeat(spans[:, 0], counts)
+        bx = np.repeat(low[:, 0], counts) + offsets % widths
+        by = np.repeat(low[:, 1], counts) + offsets // widths
+        buckets = by * self.nx + bx
+
+        order = np.argsort(buckets, kind='stable')
+        start = np.zeros(self.nx * self.ny + 1, dtype=np.int64)
+        np.cumsum(np.bincount(buckets, minlength=self.nx * self.ny), out=start[1:])
+        return start, item_ids[order]
+
+    def bucket_of(self, point):
+        """
+        Returns the (bx, by) bucket containing the point, clamped to the grid.
+        """
+        bx = min(max(int((point[0] - self.origin[0]) // self.bucket_size), 0), self.nx - 1)
+        by = min(max(int((point[1] - self.origin[1]) // self.bucket_size), 0), self.ny - 1)
+        return bx, by
+
+    def items_in(self, bx, by):
+        """
+        Returns the items listed in bucket (bx, by).
+        """
+        bucket = by * self.nx + bx
+        return self.items[self.start[bucket]:self.start[bucket + 1]]
+
+    def items_of_points(self, points):
+        """
+        Vectorized items_in for an (M, 2) array of points: returns (point_ids, items), one
+        pair per item listed in each point's bucket, grouped by point in bucket order.
+        """
+        cells = self._cells(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        buckets = cells[:, 1] * self.nx + cells[:, 0]
+        first = self.start[buckets]
+        counts = self.start[buckets + 1] - first
+        point_ids = np.repeat(np.arange(len(buckets)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return point_ids, self.items[np.repeat(first, counts) + offsets]
+
+    def buckets_along(self, p, q):
+        """
+        Yields every bucket the segment p -> q passes through, walking them in order
+        with the Amanatides-Woo traversal. Parts of the segment outside the grid are
+        clamped onto its border buckets.
+        """
+        size = self.bucket_size
+        x0 = (p[0] - self.origin[0]) / size
+        y0 = (p[1] - self.origin[1]) / size
+        dx = (q[0] - self.origin[0]) / size - x0
+        dy = (q[1] - self.origin[1]) / size - y0
+
+        bx, by = self.bucket_of(p)
+        end_x, end_y = self.bucket_of(q)
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+
+        yield bx, by
+        while bx != end_x or by != end_y:
+            if by == end_y:
+                bx += step_x
+            elif bx == end_x:
+                by += step_y
+            else:
+                t_x = (bx + (step_x > 0) - x0) / dx
+                t_y = (by + (step_y > 0) - y0) / dy
+                if t_x <= t_y:
+                    bx += step_x
+                else:
+                    by += step_y
+            yield bx, by
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .buckets import BucketGrid
+from .mesh import Mesh, build_grid_mesh
+
+# Bump whenever the mesh building or the saved layout changes; old cache entries are then never hit
+MESH_CACHE_VERSION = 1
+
+MESH_ARRAYS = ('vertices', 'triangles', 'neighbors', 'walkable', 'constrained',
+               'bucket_origin', 'bucket_size', 'bucket_shape', 'bucket_start', 'bucket_items')
+
+
+def grid_mesh_key(grid, cell_size):
+    """
+    Returns the cache key of the mesh built from the grid: a hash of the cache version,
+    the cell size and the grid contents.
+    """
+    grid = np.ascontiguousarray(grid, dtype=bool)
+    digest = hashlib.sha256()
+    digest.update(f'{MESH_CACHE_VERSION}:{grid.shape}:{float(cell_size)!r}'.encode())
+    digest.update(np.packbits(grid).tobytes())
+    return f'mesh-v{MESH_CACHE_VERSION}-{digest.hexdigest()[:32]}'
+
+
+def mesh_arrays(mesh):
+    """
+    Returns the arrays that fully describe the mesh, its constrained-edge flags and its
+    point location index, keyed by the names in MESH_ARRAYS.
+    """
+    buckets = mesh.point_locator().buckets
+    return dict(
+        vertices=mesh.vertices,
+        triangles=mesh.triangles,
+        neighbors=mesh.neighbors,
+        walkable=mesh.walkable,
+        constrained=mesh.constrained_edges(),
+        bucket_origin=buckets.origin,
+        bucket_size=np.array([buckets.bucket_size], dtype=np.float64),
+        bucket_shape=np.array([buckets.nx, buckets.ny], dtype=np.int64),
+        bucket_start=buckets.start,
+        bucket_items=buckets.items,
+    )
+
+
+def mesh_from_arrays(arrays):
+    """
+    Rebuilds a Mesh (with its point locator) around the arrays returned by mesh_arrays without copying them.
+    """
+    buckets = BucketGrid.from_arrays(arrays['bucket_origin'], arrays['bucket_size'][0], arrays['bucket_shape'],
+                                     arrays['bucket_start'], arrays['bucket_items'])
+    return Mesh.from_arrays(arrays['vertices'], arrays['triangles'], arrays['neighbors'], arrays['walkable'],
+                            arrays['constrained'], buckets)
+
+
+def save_mesh(mesh, path):
+    """
+    Saves the arrays of the mesh as one raw .npy file each in the directory path.
+    The directory is written under a temporary name and renamed into place, so readers
+    never see a half-written entry.
+    """
+    arrays = mesh_arrays(mesh)
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    temporary = tempfile.mkdtemp(prefix='.partial-', dir=parent)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary, name + '.npy'), np.ascontiguousarray(array))
+        os.replace(temporary, path)
+    except OSError:
+        # Another process stored the same entry first
+        shutil.rmtree(temporary, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+
+
+def load_mesh(path):
+    """
+    Loads a mesh saved by save_mesh. The arrays are memory-mapped read-only, so loading
+    is almost free and processes loading the same entry share its pages.
+    """
+    return mesh_from_arrays({name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+                             for name in MESH_ARRAYS})
+
+
+def cached_grid_mesh(grid, cell_size, cache_dir):
+    """
+    Returns build_grid_mesh(grid, cell_size), loading it from cache_dir when a process
+    has built the same grid before and building and storing it otherwise.
+    """
+    path = os.path.join(cache_dir, grid_mesh_key(grid, cell_size))
+    if os.path.isdir(path):
+        try:
+            return load_mesh(path)
+        except (OSError, ValueError):
+            # Damaged entry: drop it and build it again
+            shutil.rmtree(path, ignore_errors=True)
+
+    mesh = build_grid_mesh(grid, cell_size)
+    save_mesh(mesh, path)
+    return mesh
@@ -0,0 +1,97 @@
+import numpy as np
+
+# Upper bound on the number of (point, shape edge) pairs a kernel evaluates at once; larger
+# queries are split into blocks of points so the temporaries stay a few megabytes.
+CONTAINMENT_BLOCK = 1 << 18
+
+
+def triangle_contains(points, corners):
+    """
+    Vectorized is_point_in_triangle. points is a (..., 2) array and corners a
+    (..., 3, 2) array; the two broadcast against each other and the result is a bool
+    array of the broadcast shape, True where the point is inside or on the border of
+    the triangle. Either winding is accepted.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    corners = np.asarray(corners, dtype=np.float64)
+    px, py = points[..., 0], points[..., 1]
+    has_neg = False
+    has_pos = False
+    for k in range(3):
+        a = corners[..., k, :]
+        b = corners[..., (k + 1) % 3, :]
+        d = (px - b[..., 0]) * (a[..., 1] - b[..., 1]) - (a[..., 0] - b[..., 0]) * (py - b[..., 1])
+        has_neg = has_neg | (d < 0)
+        has_pos = has_pos | (d > 0)
+    return ~(has_neg & has_pos)
+
+
+def points_in_triangles(points, triangles):
+    """
+    Tests M points against N triangles. points is (M, 2) and triangles is (N, 3, 2);
+    returns the (M, N) bool mask of which triangle contains which point.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 2)
+    return triangle_contains(points[:, None, :], triangles[None, :, :, :])
+
+
+def containing_triangle(points, triangles):
+    """
+    Returns, for each of the M points, the index of the first of the N triangles that
+    contains it, or -1 (an (M,) int64 array). Points are processed in blocks so memory
+    stays bounded for large M * N.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 2)
+    result = np.full(len(points), -1, dtype=np.int64)
+    if len(triangles) == 0:
+        return result
+    block = max(1, CONTAINMENT_BLOCK // len(triangles))
+    for start in range(0, len(points), block):
+        mask = points_in_triangles(points[start:start + block], triangles)
+        first = mask.argmax(axis=1)
+        result[start:start + block] = np.where(mask[np.arange(len(mask)), first], first, -1)
+    return result
+
+
+def points_in_polygon(points, polygon):
+    """
+    Tests M points against one simple polygon given as an (n, 2) array of vertices in
+    either order, such as the result of visibility_polygon. Returns an (M,) bool mask
+    using the even-odd crossing rule: a horizontal ray from the point is crossed by the
+    edges whose half-open y range holds it. Points exactly on the border may land on
+    either side.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    inside = np.zeros(len(points), dtype=bool)
+    if len(polygon) < 3:
+        return inside
+
+    ax, ay = polygon[:, 0], polygon[:, 1]
+    bx, by = np.roll(ax, -1), np.roll(ay, -1)
+    spanning = ay != by
+    ax, ay, bx, by = ax[spanning], ay[spanning], bx[spanning], by[spanning]
+    slope = (bx - ax) / (by - ay)
+
+    block = max(1, CONTAINMENT_BLOCK // max(1, len(ax)))
+    for start in range(0, len(points), block):
+        x = points[start:start + block, 0:1]
+        y = points[start:start + block, 1:2]
+        crossing = ((ay > y) != (by > y)) & (x < ax + (y - ay) * slope)
+        inside[start:start + block] = np.count_nonzero(crossing, axis=1) % 2 == 1
+    return inside
+
+
+def points_in_visible_triangles(mesh, points, visible_triangles):
+    """
+    Classifies M points against a visibility result given as triangle indices (as
+    returned by triangular_expansion_cdt or visibility_many). Returns an (M,) bool mask,
+    True for the points whose containing triangle is visible; points outside the mesh
+    are not visible.
+    """
+    located = mesh.point_locator().locate_many(points)
+    visible = np.zeros(len(mesh.triangles), dtype=bool)
+    visible[np.asarray(visible_triangles, dtype=np.int64)] = True
+    return (located >= 0) & visible[np.maximum(located, 0)]
@@ -0,0 +1,493 @@
+import random
+import time
+import warnings
+from math import cos, sin, pi
+
+import numpy as np
+import triangle as tr
+
+from .geometry import check_view_cone, clip_segment_to_cone, segment_closest_point, view_cone_wedges
+from .locate import PointLocator
+from .mesh import FLAG_CONSTRAINED_EDGE, Mesh, mesh_from_triangles
+from .segments import ObstacleEdges
+
+
+class Triangle:
+    def __init__(self, vertices, is_obstacle=False, index=None):
+        self.vertices = vertices
+        self.index = index
+        self.edges = [(tuple(vertices[i]), tuple(vertices[(i + 1) % 3])) for i in range(3)]
+        self.neighbors = [None, None, None]
+        self.is_obstacle = is_obstacle
+
+    def contains_point(self, point):
+        def sign(p1, p2, p3):
+            return (p1[0] - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (p1[1] - p3[1])
+
+        b1 = sign(point, self.vertices[0], self.vertices[1]) < 0.0
+        b2 = sign(point, self.vertices[1], self.vertices[2]) < 0.0
+        b3 = sign(point, self.vertices[2], self.vertices[0]) < 0.0
+
+        return (b1 == b2) and (b2 == b3)
+
+
+def random_polygon(center, radius, num_vertices, rng=random):
+    angle_step = 2 * pi / num_vertices
+    vertices = []
+    for i in range(num_vertices):
+        angle = angle_step * i + rng.uniform(-angle_step / 4, angle_step / 4)
+        r = radius * rng.uniform(0.7, 1.0)
+        x = center[0] + r * cos(angle)
+        y = center[1] + r * sin(angle)
+        vertices.append((x, y))
+    return vertices
+
+
+def triangulate_polygon_with_holes(bounding_polygon, holes):
+    """
+    Runs the constrained triangulation of the bounding polygon minus the holes and
+    returns triangle's output dict ('vertices' and 'triangles' arrays).
+    """
+    points = list(bounding_polygon)
+    segments = [(i, (i + 1) % len(points)) for i in range(len(points))]
+
+    for hole in holes:
+        hole_start_index = len(points)
+        points.extend(hole)
+        segments.extend([(hole_start_index + i, hole_start_index + (i + 1) % len(hole)) for i in range(len(hole))])
+
+    input_data = {
+        'vertices': np.array(points),
+        'segments': np.array(segments),
+    }
+    if holes:
+        input_data['holes'] = np.array([np.mean(hole, axis=0) for hole in holes])
+
+    return tr.triangulate(input_data, 'p')
+
+
+def triangulate_with_holes(bounding_polygon, holes):
+    triangulated_data = triangulate_polygon_with_holes(bounding_polygon, holes)
+
+    triangles = []
+    for index, tri_indices in enumerate(triangulated_data['triangles']):
+        vertices = [tuple(triangulated_data['vertices'][i]) for i in tri_indices]
+        triangles.append(Triangle(vertices, index=index))
+
+    return triangles, holes
+
+
+def triangulate_mesh_with_holes(bounding_polygon, holes):
+    """
+    Array counterpart of triangulate_with_holes: returns (mesh, holes) with the level as
+    a Mesh instead of Triangle objects. Row i of the mesh is triangle i of
+    triangulate_with_holes.
+    """
+    triangulated_data = triangulate_polygon_with_holes(bounding_polygon, holes)
+    return Mesh(triangulated_data['vertices'], triangulated_data['triangles']), holes
+
+
+def random_level_holes(num_holes, width, height, margin=50, seed=None):
+    """
+    Draws the bounding polygon and the random holes of a level, from the random module
+    or, when a seed is given, from a private generator. Returns (bounding_polygon, holes).
+    """
+    rng = random if seed is None else random.Random(seed)
+    bounding_polygon = [(margin, margin), (width - margin, margin), (width - margin, height - margin),
+                        (margin, height - margin)]
+    holes = []
+
+    for _ in range(num_holes):
+        center = (rng.randint(100, width - 100), rng.randint(100, height - 100))
+        radius = rng.randint(30, 100)
+        num_vertices = rng.randint(3, 8)
+        holes.append(random_polygon(center, radius, num_vertices, rng))
+
+    return bounding_polygon, holes
+
+
+def generate_random_level_with_holes(num_holes, width, height, margin=50, seed=None):
+    """
+    Triangulates a width x height level with num_holes random polygonal holes (see random_level_holes).
+    """
+    return triangulate_with_holes(*random_level_holes(num_holes, width, height, margin, seed))
+
+
+def generate_grid(rows, cols, cell_size, hole_probability=0.2, seed=None):
+    """
+    Splits every cell of a rows x cols grid into two triangles. Cells become holes
+    with the given probability; their triangles are flagged as obstacles. The holes are
+    drawn from the random module, or from a private generator when a seed is given.
+    """
+    rng = random if seed is None else random.Random(seed)
+    walkable = np.ones((cols, rows), dtype=bool)
+    for row in range(rows):
+        for col in range(cols):
+            walkable[col, row] = rng.random() >= hole_probability
+    return triangles_from_grid(walkable, cell_size)
+
+
+def triangles_from_grid(grid, cell_size):
+    """
+    Builds a d-TEA level from a grid[x, y] of walkable cells: every cell is split into
+    two triangles and blocked cells become holes whose triangles are flagged as
+    obstacles. Returns (triangles, holes, hole_boxes) like generate_grid.
+    """
+    width, height = grid.shape
+    triangles = []
+    holes = []
+    hole_boxes = []
+    for row in range(height):
+        for col in range(width):
+            x = col * cell_size
+            y = row * cell_size
+            vertices = [(x, y), (x + cell_size, y), (x, y + cell_size), (x + cell_size, y + cell_size)]
+
+            is_hole = not grid[col, row]
+            if is_hole:
+                holes.append(vertices)
+                hole_boxes.append(bounding_box(vertices))
+            triangles.append(Triangle([vertices[0], vertices[1], vertices[3]], is_obstacle=is_hole,
+                                      index=len(triangles)))
+            triangles.append(Triangle([vertices[0], vertices[3], vertices[2]], is_obstacle=is_hole,
+                                      index=len(triangles)))
+
+    return triangles, holes, hole_boxes
+
+
+def grid_level_mesh(grid, cell_size):
+    """
+    Array counterpart of triangles_from_grid: returns (mesh, holes, hole_boxes) with the
+    level as a Mesh whose row i is triangle i of triangles_from_grid. Triangles of
+    blocked cells are not walkable. Vertices are the cell corners, corner (x, y) being
+    vertex x * (height + 1) + y, so the mesh takes a few dozen bytes per triangle.
+    """
+    width, height = grid.shape
+    rows, cols = np.divmod(np.arange(width * height), width)
+
+    def corner(dx, dy):
+        return (cols + dx) * (height + 1) + rows + dy
+
+    top_left, top_right, bottom_left, bottom_right = corner(0, 0), corner(1, 0), corner(0, 1), corner(1, 1)
+    triangles = np.stack([np.stack([top_left, top_right, bottom_right], axis=1),
+                          np.stack([top_left, bottom_right, bottom_left], axis=1)], axis=1).reshape(-1, 3)
+    lattice = np.stack(np.meshgrid(np.arange(width + 1), np.arange(height + 1), indexing='ij'), axis=-1)
+    walkable = np.repeat(grid[cols, rows], 2)
+    mesh = Mesh(lattice.reshape(-1, 2) * float(cell_size), triangles, walkable)
+
+    holes = []
+    hole_boxes = []
+    for col, row in zip(cols[~grid[cols, rows]].tolist(), rows[~grid[cols, rows]].tolist()):
+        x = col * cell_size
+        y = row * cell_size
+        holes.append([(x, y), (x + cell_size, y), (x, y + cell_size), (x + cell_size, y + cell_size)])
+        hole_boxes.append((x, x + cell_size, y, y + cell_size))
+    return mesh, holes, hole_boxes
+
+
+def bounding_box(vertices):
+    x_coords, y_coords = zip(*vertices)
+    return min(x_coords), max(x_coords), min(y_coords), max(y_coords)
+
+
+def box_intersects_line(p, q, box):
+    (min_x, max_x, min_y, max_y) = box
+    return not (q[0] < min_x and p[0] < min_x or
+                q[0] > max_x and p[0] > max_x or
+                q[1] < min_y and p[1] < min_y or
+                q[1] > max_y and p[1] > max_y)
+
+
+def line_intersects_triangle(p, q, vertices):
+    def ccw(a, b, c):
+        return (c[1] - a[1]) * (b[0] - a[0]) > (b[1] - a[1]) * (c[0] - a[0])
+
+    edges = [(vertices[i], vertices[(i + 1) % len(vertices)]) for i in range(len(vertices))]
+
+    for temp_a, temp_b in edges:
+        if (ccw(temp_a, p, q) != ccw(temp_b, p, q) and
+                ccw(temp_a, temp_b, p) != ccw(temp_a, temp_b, q)):
+            return True
+    return False
+
+
+def assign_neighbors(triangles):
+    """
+    Links every triangle to the triangles sharing its edges. Triangles built without an
+    index get their position in the list, which d_TEA uses to index its visited array.
+    """
+    edge_to_triangle = {}
+
+    for position, tri in enumerate(triangles):
+        if tri.index is None:
+            tri.index = position
+        for i, edge in enumerate(tri.edges):
+            edge_key = tuple(sorted(edge))
+            if edge_key in edge_to_triangle:
+                other_tri, other_edge_index = edge_to_triangle[edge_key]
+                tri.neighbors[i] = other_tri
+                other_tri.neighbors[other_edge_index] = tri
+            else:
+                edge_to_triangle[edge_key] = (tri, i)
+
+
+def build_triangle_locator(triangles):
+    """
+    Builds a PointLocator over a list of Triangle objects; located indices refer to that list.
+    """
+    return PointLocator(mesh_from_triangles([tri.vertices for tri in triangles],
+                                            [not tri.is_obstacle for tri in triangles]))
+
+
+def find_containing_triangle(triangles, point, locator=None, stats=None):
+    if stats is not None:
+        with stats.timer('locate'):
+            return find_containing_triangle(triangles, point, locator)
+    if locator is not None:
+        index = locator.locate(point)
+        return triangles[index] if index is not None else None
+    for triangle in triangles:
+        if triangle.contains_point(point):
+            return triangle
+    return None
+
+
+def cone_edge_targets(point, wedges, a, b, exact_range=False):
+    """
+    Returns the points d-TEA tests for the edge a -> b under a view cone: for every part
+    of the edge inside the wedges of view_cone_wedges, its point closest to the observer
+    with exact_range and its midpoint otherwise. Empty if the edge misses the cone.
+    """
+    if exact_range:
+        return [segment_closest_point(point, start, end) for start, end in clip_segment_to_cone(point, wedges, a, b)]
+    return [((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+            for start, end in clip_segment_to_cone(point, wedges, a, b)]
+
+
+def d_TEA(triangle, point, visibility_range, visited, obstacles=None, obstacle_boxes=None, obstacle_index=None,
+          stats=None, exact_range=False, heading=None, half_angle=None):
+    """
+    Distance-constrained triangular expansion from the triangle containing the point.
+    Crosses an edge when its midpoint is within the visibility range and, if obstacles
+    are given, the sight line to the midpoint does not cross any of them. obstacles is a
+    prebuilt ObstacleEdges or a plain list of polygons, which is flattened into an
+    ObstacleEdges on every call. The fast path is to build the ObstacleEdges (or an
+    ObstacleIndex, which only tests the obstacles near each sight line) once and pass it
+    as obstacle_index, rebuilding it when the obstacles change. obstacle_boxes is
+    deprecated and ignored.
+
+    With exact_range the midpoint is replaced by the point of the edge closest to the
+    observer: an edge is crossed exactly when it enters the range circle, so long edges
+    reaching into it are no longer rejected and triangles wholly outside it are never
+    entered. The sight line is then tested to that closest point.
+
+    With a heading the expansion is limited to the view cone of half_angle radians on
+    either side of it: an edge is only crossed through its parts inside the cone (see
+    cone_edge_targets), so the branches behind the observer are never expanded.
+
+    The expansion runs on an explicit stack, so large ranges cannot hit the recursion
+    limit. visited is a preallocated NumPy bool array with one entry per triangle
+    (indexed by Triangle.index); the entries a query sets are cleared again before it
+    returns, so a single array serves every query. A QueryStats given as stats receives
+    the expansion and obstacle times and counters.
+    """
+    check_view_cone(heading, half_angle)
+    visible_triangles = []
+    if triangle.is_obstacle:
+        return visible_triangles
+    if triangle.index is None:
+        raise ValueError('d_TEA needs indexed triangles; build them with an index or run assign_neighbors first')
+    if stats is not None:
+        started = time.perf_counter()
+
+    if obstacle_boxes is not None:
+        warnings.warn('d_TEA ignores obstacle_boxes; ObstacleEdges filters by edge boxes itself',
+                      DeprecationWarning, stacklevel=2)
+    if obstacle_index is None and obstacles:
+        obstacle_index = obstacles if isinstance(obstacles, ObstacleEdges) else ObstacleEdges(obstacles)
+
+    def blocked(target):
+        if obstacle_index is None:
+            return False
+        return obstacle_index.segment_blocked(point, target, stats)
+
+    if stats is not None:
+        untimed_blocked = blocked
+
+        def blocked(target):
+            with stats.timer('obstacles'):
+                return untimed_blocked(target)
+
+    range_squared = visibility_range * visibility_range
+    wedges = None if heading is None else view_cone_wedges(point, heading, half_angle)
+    visited[triangle.index] = True
+    stack = [triangle]
+    while stack:
+        given_triangle = stack.pop()
+        visible_triangles.append(given_triangle)
+
+        for i, edge in enumerate(given_triangle.edges):
+            neighbor = given_triangle.neighbors[i]
+            if neighbor is None or neighbor.is_obstacle:
+                if stats is not None:
+                    stats.edges_blocked += 1
+                continue
+            if visited[neighbor.index]:
+                continue
+
+            if wedges is not None:
+                targets = cone_edge_targets(point, wedges, edge[0], edge[1], exact_range)
+                if not targets:
+                    if stats is not None:
+                        stats.edges_occluded += 1
+                    continue
+                targets = [target for target in targets
+                           if (point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2 <= range_squared]
+                if not targets:
+                    if stats is not None:
+                        stats.edges_out_of_range += 1
+                    continue
+                if all(blocked(target) for target in targets):
+                    if stats is not None:
+                        stats.edges_occluded += 1
+                    continue
+                visited[neighbor.index] = True
+                stack.append(neighbor)
+                continue
+
+            if exact_range:
+                target = segment_closest_point(point, edge[0], edge[1])
+            else:
+                target = ((edge[0][0] + edge[1][0]) / 2, (edge[0][1] + edge[1][1]) / 2)
+            if (point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2 > range_squared:
+                if stats is not None:
+                    stats.edges_out_of_range += 1
+                continue
+            if blocked(target):
+                if stats is not None:
+                    stats.edges_occluded += 1
+                continue
+
+            visited[neighbor.index] = True
+            stack.append(neighbor)
+
+    visited[[tri.index for tri in visible_triangles]] = False
+    if stats is not None:
+        # Every triangle is pushed once and reported when popped
+        stats.triangles_popped += len(visible_triangles)
+        stats.triangles_accepted += len(visible_triangles)
+        stats.times['expansion'] += time.perf_counter() - started
+    return visible_triangles
+
+
+def mesh_d_TEA(mesh, triangle_index, point, visibility_range, visited, obstacle_index=None, stats=None,
+               exact_range=False, heading=None, half_angle=None):
+    """
+    d_TEA on a Mesh: expands from the walkable triangle triangle_index, crossing an
+    edge when it is not constrained in mesh.flags(), its midpoint is within the
+    visibility range and, with an obstacle_index, the sight line to the midpoint is
+    clear. Returns the reached triangle indices as a list, the same set d_TEA finds.
+    exact_range tests the closest point of the edge instead of its midpoint, and heading
+    and half_angle limit the expansion to a view cone, both as in d_TEA;
+    clip_triangles_to_circle turns the result into the visible region.
+
+    The loop reads the mesh arrays through flat memoryviews, which index about as fast
+    as lists without creating a Python object per triangle, and compares squared
+    distances. visited follows the d_TEA convention: one bool per triangle, all False
+    between queries. A QueryStats given as stats receives the times and counters.
+    """
+    check_view_cone(heading, half_angle)
+    if triangle_index is None or not mesh.walkable[triangle_index]:
+        return []
+    if stats is not None:
+        started = time.perf_counter()
+
+    flags = memoryview(mesh.flags())
+    triangles = memoryview(np.ascontiguousarray(mesh.triangles).reshape(-1))
+    neighbors = memoryview(np.ascontiguousarray(mesh.neighbors).reshape(-1))
+    vertices = memoryview(np.ascontiguousarray(mesh.vertices).reshape(-1))
+    seen = memoryview(visited)
+    px, py = float(point[0]), float(point[1])
+    observer = (px, py)
+    range_squared = visibility_range * visibility_range
+    wedges = None if heading is None else view_cone_wedges(observer, heading, half_angle)
+
+    blocked = None
+    if obstacle_index is not None:
+        if stats is None:
+            def blocked(target):
+                return obstacle_index.segment_blocked(observer, target)
+        else:
+            def blocked(target):
+                with stats.timer('obstacles'):
+                    return obstacle_index.segment_blocked(observer, target, stats)
+
+    seen[triangle_index] = True
+    stack = [triangle_index]
+    reached = []
+    while stack:
+        current = stack.pop()
+        reached.append(current)
+        current_flags = flags[current]
+        base = 3 * current
+
+        for k in range(3):
+            if current_flags & FLAG_CONSTRAINED_EDGE[k]:
+                if stats is not None:
+                    stats.edges_blocked += 1
+                continue
+            neighbor = neighbors[base + k]
+            if seen[neighbor]:
+                continue
+
+            a = 2 * triangles[base + k]
+            b = 2 * triangles[base + (k + 1) % 3]
+            if wedges is not None:
+                targets = cone_edge_targets(observer, wedges, (vertices[a], vertices[a + 1]),
+                                            (vertices[b], vertices[b + 1]), exact_range)
+                if not targets:
+                    if stats is not None:
+                        stats.edges_occluded += 1
+                    continue
+                targets = [(tx, ty) for tx, ty in targets if (tx - px) ** 2 + (ty - py) ** 2 <= range_squared]
+                if not targets:
+                    if stats is not None:
+                        stats.edges_out_of_range += 1
+                    continue
+                if blocked is not None and all(blocked(target) for target in targets):
+                    if stats is not None:
+                        stats.edges_occluded += 1
+                    continue
+                seen[neighbor] = True
+                stack.append(neighbor)
+                continue
+
+            if exact_range:
+                # Closest point of the edge to the observer
+                ax, ay = vertices[a], vertices[a + 1]
+                dx, dy = vertices[b] - ax, vertices[b + 1] - ay
+                t = ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)
+                t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+                tx, ty = ax + t * dx, ay + t * dy
+            else:
+                tx = (vertices[a] + vertices[b]) / 2
+                ty = (vertices[a + 1] + vertices[b + 1]) / 2
+            if (tx - px) ** 2 + (ty - py) ** 2 > range_squared:
+                if stats is not None:
+                    stats.edges_out_of_range += 1
+                continue
+            if blocked is not None and blocked((tx, ty)):
+                if stats is not None:
+                    stats.edges_occluded += 1
+                continue
+
+            seen[neighbor] = True
+            stack.append(neighbor)
+
+    visited[reached] = False
+    if stats is not None:
+        # Every triangle is pushed once and reported when popped
+        stats.triangles_popped += len(reached)
+        stats.triangles_accepted += len(reached)
+        stats.times['expansion'] += time.perf_counter() - started
+    return reached
@@ -0,0 +1,262 @@
+import time
+
+from .geometry import (
+    orient,
+    clip_edge_to_window,
+    clip_segment_to_cone,
+    segment_distance_squared,
+    view_cone_wedges,
+    check_view_cone,
+)
+from .locate import find_observer_triangle
+from .los import is_visible
+
+# The two local edges a triangle entered through edge e leaves through
+EXIT_EDGES = ((1, 2), (2, 0), (0, 1))
+
+# Fraction of the way towards the centroid an observer is moved when it sits exactly
+# on an edge or vertex of its triangle, so every view window starts out non-degenerate.
+OBSERVER_NUDGE = 1e-7
+
+
+def nudge_observer(observer, corners):
+    """
+    Returns the observer, moved slightly towards the centroid of the given triangle
+    corners if it lies on one of the triangle's edges.
+    """
+    if all(orient(corners[i], corners[(i + 1) % 3], observer) != 0 for i in range(3)):
+        return observer
+    cx = (corners[0][0] + corners[1][0] + corners[2][0]) / 3
+    cy = (corners[0][1] + corners[1][1] + corners[2][1]) / 3
+    return (observer[0] + OBSERVER_NUDGE * (cx - observer[0]),
+            observer[1] + OBSERVER_NUDGE * (cy - observer[1]))
+
+
+def entry_edge(neighbors, triangle_index, previous):
+    """
+    Returns the local edge of triangle_index that borders previous, given the flat
+    neighbor view of Mesh.flat_views().
+    """
+    base = 3 * triangle_index
+    if neighbors[base] == previous:
+        return 0
+    return 1 if neighbors[base + 1] == previous else 2
+
+
+def iterative_visibility_expansion(mesh, observer_triangle_index, observer, boundary=None, stats=None,
+                                   visibility_range=None, heading=None, half_angle=None):
+    """
+    Triangular expansion as in Bungiu et al.: a (right, left) view window is carried
+    through every crossed edge and restricted with orientation tests, so each query
+    only touches the triangles that are actually visible.
+
+    Windows are stored as points on their boundary rays; the window (r, l) covers the
+    directions from the observer that are counter-clockwise of r and clockwise of l.
+    Because triangles are counter-clockwise, a triangle entered through its local edge
+    e has its right corner at e + 1 and leaves through edges e + 1 and e + 2. An edge
+    is crossed when the neighbor on the other side is walkable. Returns the indices of
+    the visible triangles in discovery order.
+
+    If a boundary list is given, every edge the view reaches but cannot cross is
+    appended to it as (u, v, r, l): the edge from vertex u to vertex v, seen through
+    the window (r, l). A QueryStats given as stats receives the expansion time and
+    counters; every triangle is entered through one edge and tests two, so the pops
+    follow from the rejected edges and the loop only counts those.
+
+    With a visibility_range the expansion is distance constrained as in d-TEA, but
+    exactly: an edge is only crossed when the part of it seen through the window comes
+    within the range (a squared segment-to-point distance), since everything behind
+    that part is farther away. The query then touches only the triangles that are
+    visible and at least partly in range. Edges rejected this way are reported in
+    boundary like walls, so their pieces close the visibility polygon outside the circle.
+
+    With a heading the view is limited to the cone of half_angle radians on either side
+    of it (see view_cone_wedges): the first windows are the observer triangle's edges
+    clipped to the cone, so branches outside it are never entered.
+
+    The loop reads the mesh through Mesh.flat_views(), so a memory-mapped or shared
+    mesh is queried in place.
+    """
+    check_view_cone(heading, half_angle)
+    if stats is not None:
+        started = time.perf_counter()
+    vertices, triangles, neighbors, walkable = mesh.flat_views()
+    base = 3 * observer_triangle_index
+    q = nudge_observer(observer, [(vertices[2 * i], vertices[2 * i + 1]) for i in triangles[base:base + 3]])
+    range_squared = None if visibility_range is None else visibility_range * visibility_range
+    wedges = None if heading is None else view_cone_wedges(q, heading, half_angle)
+
+    visible_triangles = [observer_triangle_index]
+    seen = {observer_triangle_index}
+    stack = []
+
+    for k in range(3):
+        next_triangle = neighbors[base + k]
+        u, v = triangles[base + k], triangles[base + (k + 1) % 3]
+        pu, pv = (vertices[2 * u], vertices[2 * u + 1]), (vertices[2 * v], vertices[2 * v + 1])
+        if wedges is None:
+            windows = [(pu, pv)]
+        else:
+            windows = [(a, b) for a, b in clip_segment_to_cone(q, wedges, pu, pv) if orient(q, a, b) > 0]
+            if not windows and stats is not None:
+                stats.edges_occluded += 1
+        for r, l in windows:
+            if next_triangle >= 0 and walkable[next_triangle]:
+                if range_squared is None or segment_distance_squared(q, r, l) <= range_squared:
+                    entry = entry_edge(neighbors, next_triangle, observer_triangle_index)
+                    stack.append((next_triangle, entry, r[0], r[1], l[0], l[1]))
+                    continue
+                if stats is not None:
+                    stats.edges_out_of_range += 1
+            elif stats is not None:
+                stats.edges_blocked += 1
+            if boundary is not None:
+                boundary.append((u, v, r, l))
+
+    if stats is not None:
+        rejected_before = stats.edges_blocked + stats.edges_occluded + stats.edges_out_of_range
+        first_pushes = len(stack)
+
+    # The loop works on scalar coordinates; orientations are spelled out as in orient()
+    qx, qy = q
+    while stack:
+        triangle_index, e, rx, ry, lx, ly = stack.pop()
+        if triangle_index not in seen:
+            seen.add(triangle_index)
+            visible_triangles.append(triangle_index)
+
+        base = 3 * triangle_index
+        for k in EXIT_EDGES[e]:
+            next_triangle = neighbors[base + k]
+            u, v = triangles[base + k], triangles[base + (k + 1) % 3]
+            if next_triangle < 0 or not walkable[next_triangle]:
+                if boundary is not None:
+                    boundary.append((u, v, (rx, ry), (lx, ly)))
+                if stats is not None:
+                    stats.edges_blocked += 1
+                continue
+            ux, uy = vertices[2 * u], vertices[2 * u + 1]
+            vx, vy = vertices[2 * v], vertices[2 * v + 1]
+            if (rx - qx) * (uy - qy) - (ry - qy) * (ux - qx) > 0:
+                new_rx, new_ry = ux, uy
+            else:
+                new_rx, new_ry = rx, ry
+            if (vx - qx) * (ly - qy) - (vy - qy) * (lx - qx) > 0:
+                new_lx, new_ly = vx, vy
+            else:
+                new_lx, new_ly = lx, ly
+            if (new_rx - qx) * (new_ly - qy) - (new_ry - qy) * (new_lx - qx) <= 0:
+                if stats is not None:
+                    stats.edges_occluded += 1
+                continue
+            if range_squared is not None:
+                piece = clip_edge_to_window(q, (ux, uy), (vx, vy), (rx, ry), (lx, ly))
+                a, b = piece if piece is not None else ((ux, uy), (vx, vy))
+                if segment_distance_squared(q, a, b) > range_squared:
+                    if boundary is not None:
+                        boundary.append((u, v, (rx, ry), (lx, ly)))
+                    if stats is not None:
+                        stats.edges_out_of_range += 1
+                    continue
+            # entry_edge, inlined
+            after = 3 * next_triangle
+            entry = 0 if neighbors[after] == triangle_index else 1 if neighbors[after + 1] == triangle_index else 2
+            stack.append((next_triangle, entry, new_rx, new_ry, new_lx, new_ly))
+
+    if stats is not None:
+        # 2 * pops = rejected + pushes in the loop, and pops = those pushes + the first pushes
+        rejected = stats.edges_blocked + stats.edges_occluded + stats.edges_out_of_range - rejected_before
+        stats.triangles_popped += rejected - first_pushes
+        stats.triangles_accepted += len(visible_triangles)
+        stats.times['expansion'] += time.perf_counter() - started
+    return visible_triangles
+
+
+def triangular_expansion_cdt(mesh, observer, stats=None, visibility_range=None, heading=None, half_angle=None):
+    """
+    Locates the observer in the mesh and returns the indices of the visible triangles,
+    only those at least partly within visibility_range of the observer if one is given
+    and inside the view cone of half_angle radians around heading if that is given.
+    A QueryStats given as stats receives the location and expansion times and counters.
+    """
+    check_view_cone(heading, half_angle)
+    if stats is None:
+        observer_triangle_index = find_observer_triangle(mesh, observer)
+    else:
+        with stats.timer('locate'):
+            observer_triangle_index = find_observer_triangle(mesh, observer)
+    if observer_triangle_index is None or not mesh.walkable[observer_triangle_index]:
+        return []
+    return iterative_visibility_expansion(mesh, observer_triangle_index, observer, stats=stats,
+                                          visibility_range=visibility_range, heading=heading, half_angle=half_angle)
+
+
+def edge_visibility_expansion(mesh, observer, grid, cell_size, stats=None, heading=None, half_angle=None):
+    """
+    The expansion of the Simplified TEA demos: a flood fill from the observer's
+    triangle that crosses an edge into a walkable triangle when both end points of the
+    edge are visible from the observer by grid line of sight. Each vertex is tested at
+    most once per query. Returns the indices of the reached triangles in discovery
+    order, or an empty list if the observer is outside the walkable mesh. A QueryStats
+    given as stats receives the phase times and counters. With a heading, edges that do
+    not reach into the view cone of half_angle radians around it are not crossed.
+    """
+    check_view_cone(heading, half_angle)
+    if stats is None:
+        observer_triangle_index = find_observer_triangle(mesh, observer)
+    else:
+        with stats.timer('locate'):
+            observer_triangle_index = find_observer_triangle(mesh, observer)
+        started = time.perf_counter()
+    if observer_triangle_index is None or not mesh.walkable[observer_triangle_index]:
+        return []
+
+    vertices, triangles, neighbors, walkable = mesh.flat_views()
+    wedges = None if heading is None else view_cone_wedges(observer, heading, half_angle)
+    vertex_visible = {}
+
+    def sees(vertex):
+        visible = vertex_visible.get(vertex)
+        if visible is None:
+            point = (vertices[2 * vertex], vertices[2 * vertex + 1])
+            if stats is None:
+                visible = is_visible(point, observer, grid, cell_size)
+            else:
+                with stats.timer('los'):
+                    visible = is_visible(point, observer, grid, cell_size, stats)
+            vertex_visible[vertex] = visible
+        return visible
+
+    reached = [observer_triangle_index]
+    seen = {observer_triangle_index}
+    stack = [observer_triangle_index]
+    while stack:
+        triangle_index = stack.pop()
+        base = 3 * triangle_index
+        for k in range(3):
+            next_triangle = neighbors[base + k]
+            if next_triangle < 0 or not walkable[next_triangle]:
+                if stats is not None:
+                    stats.edges_blocked += 1
+                continue
+            if next_triangle in seen:
+                continue
+            u, v = triangles[base + k], triangles[base + (k + 1) % 3]
+            if wedges is not None and not clip_segment_to_cone(observer, wedges, (vertices[2 * u], vertices[2 * u + 1]),
+                                                                (vertices[2 * v], vertices[2 * v + 1])):
+                if stats is not None:
+                    stats.edges_occluded += 1
+                continue
+            if sees(u) and sees(v):
+                seen.add(next_triangle)
+                reached.append(next_triangle)
+                stack.append(next_triangle)
+            elif stats is not None:
+                stats.edges_occluded += 1
+
+    if stats is not None:
+        # Every reached triangle is pushed and popped once
+        stats.triangles_popped += len(reached)
+        stats.triangles_accepted += len(reached)
+        stats.times['expansion'] += time.perf_counter() - started
+    return reached
@@ -0,0 +1,119 @@
+import math
+
+
+def orient(a, b, c):
+    """
+    Twice the signed area of the triangle (a, b, c).
+    Positive when c lies counter-clockwise of the ray a -> b, negative when clockwise
+    and zero when the three points are collinear.
+    """
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def ray_hit(q, p, u, v):
+    """
+    Returns the point where the line from q through p crosses the line through u and v.
+    """
+    du = orient(q, p, u)
+    dv = orient(q, p, v)
+    t = du / (du - dv)
+    return u[0] + t * (v[0] - u[0]), u[1] + t * (v[1] - u[1])
+
+
+def clip_edge_to_window(q, u, v, r, l):
+    """
+    Returns the part (a, b) of the edge u -> v that q sees between the rays towards r
+    and l, or None if the edge lies outside the window. a is the clockwise end.
+    """
+    if orient(q, r, v) <= 0 or orient(q, u, l) <= 0:
+        return None
+    a = u if orient(q, r, u) >= 0 else ray_hit(q, r, u, v)
+    b = v if orient(q, v, l) >= 0 else ray_hit(q, l, u, v)
+    if orient(q, a, b) <= 0:
+        return None
+    return a, b
+
+
+def segment_closest_point(p, a, b):
+    """
+    Returns the point of the segment a -> b closest to the point p.
+    """
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length_squared = dx * dx + dy * dy
+    if length_squared == 0:
+        return a[0], a[1]
+    t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length_squared
+    t = min(max(t, 0.0), 1.0)
+    return a[0] + t * dx, a[1] + t * dy
+
+
+def segment_distance_squared(p, a, b):
+    """
+    Squared distance from the point p to the segment a -> b. The segment reaches into
+    a circle around p exactly when this is at most the squared radius.
+    """
+    x, y = segment_closest_point(p, a, b)
+    return (x - p[0]) ** 2 + (y - p[1]) ** 2
+
+
+def check_view_cone(heading, half_angle):
+    """
+    Raises ValueError unless heading and half_angle are given together (or both left
+    None), so a query cannot silently drop half of its view cone.
+    """
+    if (heading is None) != (half_angle is None):
+        raise ValueError('heading and half_angle must be given together')
+
+
+def view_cone_wedges(observer, heading, half_angle):
+    """
+    Splits the view cone of half_angle radians on either side of heading (radians,
+    counter-clockwise from +x) into wedges narrower than 180 degrees, each given as
+    (r, l): points on its clockwise and counter-clockwise boundary rays from the
+    observer. Returns None if the cone covers every direction.
+    """
+    if half_angle >= math.pi:
+        return None
+    x, y = observer
+
+    def ray(angle):
+        return x + math.cos(angle), y + math.sin(angle)
+
+    if half_angle < math.pi / 2:
+        return [(ray(heading - half_angle), ray(heading + half_angle))]
+    middle = ray(heading)
+    return [(ray(heading - half_angle), middle), (middle, ray(heading + half_angle))]
+
+
+def clip_segment_to_wedge(q, r, l, a, b):
+    """
+    Returns the part (a, b) of the segment a -> b inside the wedge between the rays
+    from q through r and l (l counter-clockwise of r, less than 180 degrees apart), or
+    None. The wedge is the intersection of two half-planes, so the segment is clipped
+    against each in turn.
+    """
+    lo, hi = 0.0, 1.0
+    for fa, fb in ((orient(q, r, a), orient(q, r, b)), (orient(q, a, l), orient(q, b, l))):
+        if fa < 0 and fb < 0:
+            return None
+        if fa < 0:
+            lo = max(lo, fa / (fa - fb))
+        elif fb < 0:
+            hi = min(hi, fa / (fa - fb))
+    if lo > hi:
+        return None
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    return (a[0] + lo * dx, a[1] + lo * dy), (a[0] + hi * dx, a[1] + hi * dy)
+
+
+def clip_segment_to_cone(q, wedges, a, b):
+    """
+    Returns the parts of the segment a -> b inside the wedges of view_cone_wedges, one
+    (a, b) pair per wedge the segment meets.
+    """
+    pieces = []
+    for r, l in wedges:
+        piece = clip_segment_to_wedge(q, r, l, a, b)
+        if piece is not None:
+            pieces.append(piece)
+    return pieces
\ No newline at end of file
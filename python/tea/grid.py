@@ -0,0 +1,19 @@
+import numpy as np
+
+
+def create_grid(width, height, walkable_probability=0.7, seed=None):
+    """
+    Creates a (width, height) grid with random True (walkable) and False (blocked) values.
+    With a seed the grid comes from a private generator and is the same on every run.
+    """
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    return rng.choice([True, False], size=(width, height), p=[walkable_probability, 1 - walkable_probability])
+
+
+def get_square_center(pos, cell_size):
+    """
+    Returns the center of the square that contains the given position.
+    """
+    grid_x = (pos[0] // cell_size) * cell_size
+    grid_y = (pos[1] // cell_size) * cell_size
+    return grid_x + cell_size // 2, grid_y + cell_size // 2
@@ -0,0 +1,143 @@
+import numpy as np
+
+from .buckets import BucketGrid
+from .containment import triangle_contains
+from .geometry import orient
+
+
+def is_point_in_triangle(pt, tri):
+    """
+    Checks if a point is inside (or on the border of) a triangle using edge signs.
+    """
+
+    def sign(p1, p2, p3):
+        return (p1[0] - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (p1[1] - p3[1])
+
+    d1 = sign(pt, tri[0], tri[1])
+    d2 = sign(pt, tri[1], tri[2])
+    d3 = sign(pt, tri[2], tri[0])
+
+    has_neg = (d1 < 0) or (d2 < 0) or (d3 < 0)
+    has_pos = (d1 > 0) or (d2 > 0) or (d3 > 0)
+
+    return not (has_neg and has_pos)
+
+
+class PointLocator:
+    """
+    Point location over a Mesh.
+
+    Cold queries look the point up in a uniform grid of buckets, each listing the
+    triangles whose bounding box overlaps it, so they only test a handful of
+    triangles. Queries with a starting triangle (by default the previous answer)
+    walk the mesh towards the point through the neighbor array, which costs a few
+    steps for an observer that moves a little every frame. Walks that leave the
+    mesh or take more than max_walk_steps fall back to the buckets.
+
+    When a point lies on the border between a walkable and a blocked triangle, the
+    walkable one is returned. A prebuilt BucketGrid over the mesh can be passed in as
+    buckets to skip building the index.
+    """
+
+    def __init__(self, mesh, bucket_size=None, max_walk_steps=64, buckets=None):
+        self.mesh = mesh
+        self.max_walk_steps = max_walk_steps
+        self.last_triangle = None
+
+        if buckets is None:
+            corners = mesh.vertices[mesh.triangles]
+            buckets = BucketGrid(corners.min(axis=1), corners.max(axis=1), bucket_size)
+        self.buckets = buckets
+
+    def candidates(self, point):
+        """
+        Returns the indices of the triangles whose bounding box overlaps the point's bucket.
+        """
+        return self.buckets.items_in(*self.buckets.bucket_of(point))
+
+    def locate_in_buckets(self, point):
+        """
+        Finds the triangle containing the point by testing the candidates of its bucket.
+        """
+        vertices, triangles, _, walkable = self.mesh.flat_views()
+        fallback = None
+        for triangle_index in self.candidates(point).tolist():
+            base = 3 * triangle_index
+            if is_point_in_triangle(point, [(vertices[2 * i], vertices[2 * i + 1]) for i in triangles[base:base + 3]]):
+                if walkable[triangle_index]:
+                    return triangle_index
+                if fallback is None:
+                    fallback = triangle_index
+        return fallback
+
+    def candidate_pairs(self, points):
+        """
+        Vectorized candidates for an (M, 2) array of points: returns (point_ids, triangles),
+        one pair per candidate triangle of each point, grouped by point.
+        """
+        return self.buckets.items_of_points(points)
+
+    def locate_many(self, points):
+        """
+        Locates an (M, 2) array of points in one pass and returns an (M,) int64 array of
+        triangle indices, -1 for points outside the mesh. All candidate pairs are tested
+        with triangle_contains at once; like locate_in_buckets, the first containing
+        walkable candidate wins, otherwise the first containing one. The walk cache
+        (last_triangle) is neither used nor updated.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = np.full(len(points), -1, dtype=np.int64)
+        point_ids, candidates = self.candidate_pairs(points)
+        corners = self.mesh.vertices[self.mesh.triangles[candidates]]
+        inside = triangle_contains(points[point_ids], corners)
+        point_ids, candidates = point_ids[inside], candidates[inside]
+        if len(candidates):
+            # Group by point, walkable hits first; lexsort is stable so the bucket order is kept
+            order = np.lexsort((~self.mesh.walkable[candidates], point_ids))
+            point_ids, candidates = point_ids[order], candidates[order]
+            first = np.flatnonzero(np.r_[True, point_ids[1:] != point_ids[:-1]])
+            result[point_ids[first]] = candidates[first]
+        return result
+
+    def walk(self, point, start):
+        """
+        Walks from the start triangle towards the point, crossing any edge that has the
+        point on its outer side. Returns None if the walk leaves the mesh or runs too long.
+        """
+        vertices, triangles, neighbors, _ = self.mesh.flat_views()
+        triangle_index = start
+        for _ in range(self.max_walk_steps):
+            base = 3 * triangle_index
+            for k in range(3):
+                u, v = triangles[base + k], triangles[base + (k + 1) % 3]
+                if orient((vertices[2 * u], vertices[2 * u + 1]), (vertices[2 * v], vertices[2 * v + 1]), point) < 0:
+                    triangle_index = neighbors[base + k]
+                    break
+            else:
+                return triangle_index
+            if triangle_index < 0:
+                return None
+        return None
+
+    def locate(self, point, hint=None):
+        """
+        Returns the index of the triangle containing the point, or None if it is outside the mesh.
+        The walk starts from hint when given, otherwise from the previously located triangle.
+        """
+        start = hint if hint is not None else self.last_triangle
+        triangle_index = None
+        if start is not None:
+            triangle_index = self.walk(point, start)
+        if triangle_index is None or not self.mesh.walkable[triangle_index]:
+            triangle_index = self.locate_in_buckets(point)
+        if triangle_index is not None:
+            self.last_triangle = triangle_index
+        return triangle_index
+
+
+def find_observer_triangle(mesh, observer, hint=None):
+    """
+    Returns the index of the triangle that contains the observer, or None.
+    Uses the mesh's shared PointLocator.
+    """
+    return mesh.point_locator().locate(observer, hint)
@@ -0,0 +1,166 @@
+import math
+
+import numpy as np
+
+
+# Crossing parameters closer than this are treated as one crossing through a cell corner
+CORNER_EPSILON = 1e-9
+
+
+def first_blocking_cell(grid, start, end, stats=None, touched=None):
+    """
+    Walks the cells crossed by the segment start -> end (both in cell units) with the
+    Amanatides-Woo traversal, visiting every crossed cell exactly once.
+
+    Returns the first cell that is blocked or outside the grid, or None if the whole
+    segment is clear. A segment passing exactly through a cell corner is blocked when
+    both cells beside the corner are blocked. End points on a cell border belong to the
+    cell the segment is inside of, so the cell beyond the border is never tested.
+
+    With a QueryStats as stats, the test and the cells it walked are counted; the step
+    count is derived from the cell the walk ended in, so the loop itself is unchanged.
+    With a set as touched, every cell whose state the walk reads is added to it: the
+    crossed cells and the cells it checks beside the corners it passes through. The
+    answer can only change when one of those cells changes.
+    """
+    width, height = grid.shape
+    x0, y0 = start
+    x1, y1 = end
+    dx, dy = x1 - x0, y1 - y0
+
+    ix = math.floor(x0) if dx >= 0 else math.ceil(x0) - 1
+    iy = math.floor(y0) if dy >= 0 else math.ceil(y0) - 1
+    end_x = math.ceil(x1) - 1 if dx > 0 else math.floor(x1)
+    end_y = math.ceil(y1) - 1 if dy > 0 else math.floor(y1)
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+
+    def is_open(x, y):
+        return 0 <= x < width and 0 <= y < height and grid[x, y]
+
+    if touched is not None:
+        untracked_is_open = is_open
+
+        def is_open(x, y):
+            touched.add((x, y))
+            return untracked_is_open(x, y)
+
+    first_x, first_y = ix, iy
+    corners = 0
+    while True:
+        if not is_open(ix, iy):
+            if stats is not None:
+                _count_walk(stats, first_x, first_y, ix, iy, corners)
+            return ix, iy
+        if ix == end_x and iy == end_y:
+            if stats is not None:
+                _count_walk(stats, first_x, first_y, ix, iy, corners)
+            return None
+        if iy == end_y:
+            ix += step_x
+            continue
+        if ix == end_x:
+            iy += step_y
+            continue
+
+        # Parameters along the segment where it leaves the current cell in x and in y
+        t_x = (ix + (step_x > 0) - x0) / dx
+        t_y = (iy + (step_y > 0) - y0) / dy
+        if t_x < t_y - CORNER_EPSILON:
+            ix += step_x
+        elif t_y < t_x - CORNER_EPSILON:
+            iy += step_y
+        else:
+            # Exactly through a corner: squeezing between two blocked cells is not allowed
+            if not is_open(ix + step_x, iy) and not is_open(ix, iy + step_y):
+                if stats is not None:
+                    _count_walk(stats, first_x, first_y, ix, iy, corners)
+                return ix + step_x, iy
+            ix += step_x
+            iy += step_y
+            corners += 1
+
+
+def _count_walk(stats, first_x, first_y, x, y, corners):
+    # Every step moves one axis by one cell, except corner steps which move both
+    stats.los_checks += 1
+    stats.los_steps += abs(x - first_x) + abs(y - first_y) - corners + 1
+
+
+def is_visible(point, observer, grid, cell_size, stats=None):
+    """
+    Checks if a point is visible from the observer. Both positions are in pixels; the
+    grid is indexed by cell as grid[x, y]. Each crossed cell is tested once.
+    """
+    if point[0] == observer[0] and point[1] == observer[1]:
+        return True
+    start = (observer[0] / cell_size, observer[1] / cell_size)
+    end = (point[0] / cell_size, point[1] / cell_size)
+    return first_blocking_cell(grid, start, end, stats) is None
+
+
+def is_triangle_visible(given_triangle, observer, grid, cell_size):
+    """
+    Determines if any vertex of the triangle is visible from the observer.
+    """
+    for point in given_triangle:
+        if is_visible(point, observer, grid, cell_size):
+            return True
+    return False
+
+
+def batch_is_visible(observer, targets, grid, cell_size):
+    """
+    Vectorized is_visible: tests every row of targets (an (N, 2) array of pixel positions)
+    against the observer at once and returns an (N,) boolean mask.
+
+    Each ray is cut at all the vertical and horizontal grid lines it crosses; the middle
+    of every piece lies inside exactly one crossed cell, so the cells come out of one
+    broadcasted pass and a ray is clear when np.all of its cells are walkable. Pieces of
+    zero length mark rays through a cell corner, which are blocked when both cells
+    beside the corner are blocked.
+    """
+    width, height = grid.shape
+    targets = np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+    start = np.asarray(observer, dtype=np.float64) / cell_size
+    delta = targets / cell_size - start
+    if len(targets) == 0:
+        return np.zeros(0, dtype=bool)
+
+    def crossings(axis):
+        d = delta[:, axis]
+        count = int(np.ceil(np.abs(d).max())) + 1
+        k = np.arange(1, count + 1)
+        lines = np.where(d[:, None] > 0, np.floor(start[axis]) + k, np.ceil(start[axis]) - k)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (lines - start[axis]) / d[:, None]
+        return np.where((t > 0) & (t < 1), t, 1.0)
+
+    n = len(targets)
+    t = np.sort(np.concatenate([np.zeros((n, 1)), crossings(0), crossings(1), np.ones((n, 1))], axis=1), axis=1)
+    middle = (t[:, :-1] + t[:, 1:]) / 2
+    piece = (t[:, 1:] - t[:, :-1]) > CORNER_EPSILON
+
+    points = start + middle[:, :, None] * delta[:, None, :]
+    cx = np.floor(points[:, :, 0]).astype(np.int64)
+    cy = np.floor(points[:, :, 1]).astype(np.int64)
+
+    def is_open(x, y):
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        return inside & grid[np.clip(x, 0, width - 1), np.clip(y, 0, height - 1)]
+
+    clear = np.all(~piece | is_open(cx, cy), axis=1)
+
+    # Zero-length pieces before the end are corner crossings between the pieces around them
+    corner = ~piece & (t[:, 1:] < 1)
+    corner[:, 0] = False
+    if corner.any():
+        rows, cols = np.nonzero(corner)
+        before_x, before_y = cx[rows, cols - 1], cy[rows, cols - 1]
+        after_x, after_y = cx[rows, cols + 1], cy[rows, cols + 1]
+        squeezed = ~is_open(after_x, before_y) & ~is_open(before_x, after_y)
+        clear[rows[squeezed]] = False
+
+    same = np.all(delta == 0, axis=1)
+    clear[same] = True
+    return clear
@@ -0,0 +1,151 @@
+import numpy as np
+
+from .dtea import triangulate_with_holes
+
+
+def noise_grid(width, height, density=0.3, seed=0):
+    """
+    Returns a (width, height) grid in which every cell is blocked independently with
+    probability density.
+    """
+    return np.random.default_rng(seed).random((width, height)) >= density
+
+
+def neighbor_walls(walls):
+    """
+    Counts for every cell how many of its 8 neighbors are walls; cells outside the grid count as walls.
+    """
+    padded = np.pad(walls, 1, constant_values=True).astype(np.uint8)
+    width, height = walls.shape
+    counts = np.zeros((width, height), dtype=np.uint8)
+    for dx in range(3):
+        for dy in range(3):
+            if dx != 1 or dy != 1:
+                counts += padded[dx:dx + width, dy:dy + height]
+    return counts
+
+
+def cave_grid(width, height, density=0.45, smoothing=4, seed=0):
+    """
+    Returns a cave-like grid: random noise with the given wall density, smoothed by
+    smoothing rounds of the 4-5 cellular automaton (a cell becomes a wall when at least
+    five of its neighbors are walls, and stays one with four).
+    """
+    walls = ~noise_grid(width, height, density, seed)
+    for _ in range(smoothing):
+        counts = neighbor_walls(walls)
+        walls = (counts >= 5) | (walls & (counts == 4))
+    return ~walls
+
+
+def room_grid(width, height, rooms=None, room_size=(4, 12), seed=0):
+    """
+    Returns a dungeon-like grid of rectangular rooms, each joined to the next one by an
+    L-shaped corridor so every room is reachable. rooms defaults to one per 400 cells;
+    room sides are drawn from the room_size range.
+    """
+    rng = np.random.default_rng(seed)
+    if rooms is None:
+        rooms = max(1, width * height // 400)
+    low, high = room_size
+    sizes = rng.integers(low, high + 1, size=(rooms, 2))
+    sizes = np.minimum(sizes, [max(width - 2, 1), max(height - 2, 1)])
+    corners = rng.integers(1, np.maximum([width, height] - sizes, 2), size=(rooms, 2))
+    centers = corners + sizes // 2
+
+    grid = np.zeros((width, height), dtype=bool)
+    for (x, y), (w, h) in zip(corners.tolist(), sizes.tolist()):
+        grid[x:x + w, y:y + h] = True
+    for (x0, y0), (x1, y1) in zip(centers[:-1].tolist(), centers[1:].tolist()):
+        grid[min(x0, x1):max(x0, x1) + 1, y0] = True
+        grid[x1, min(y0, y1):max(y0, y1) + 1] = True
+    return grid
+
+
+def corridor_grid(width, height, corridor_width=1, loops=0.05, seed=0):
+    """
+    Returns a maze of corridor_width wide corridors. Rooms of the maze lattice are
+    joined with the binary-tree algorithm (every room opens towards +x or +y at random,
+    which yields a spanning tree), then a loops fraction of the remaining walls is
+    opened as well so the maze has cycles.
+    """
+    rng = np.random.default_rng(seed)
+    pitch = corridor_width + 1
+    nx = max(1, (width - 1) // pitch)
+    ny = max(1, (height - 1) // pitch)
+    xs = 1 + np.arange(nx) * pitch
+    ys = 1 + np.arange(ny) * pitch
+
+    grid = np.zeros((width, height), dtype=bool)
+    offsets = np.arange(corridor_width)
+    grid[np.ix_((xs[:, None] + offsets).ravel(), (ys[:, None] + offsets).ravel())] = True
+
+    east = rng.random((nx, ny)) < 0.5
+    east[-1, :] = False
+    east[:, -1] = True
+    east[-1, -1] = False
+    south = ~east
+    south[:, -1] = False
+    east |= rng.random((nx, ny)) < loops
+    south |= rng.random((nx, ny)) < loops
+    east[-1, :] = False
+    south[:, -1] = False
+
+    for opened, (step_x, step_y) in ((east, (1, 0)), (south, (0, 1))):
+        ix, iy = np.nonzero(opened)
+        for offset in offsets:
+            x = xs[ix] + (corridor_width if step_x else offset)
+            y = ys[iy] + (corridor_width if step_y else offset)
+            grid[x, y] = True
+    return grid
+
+
+# style -> generator(width, height, seed=..., **parameters)
+MAP_STYLES = {
+    'noise': noise_grid,
+    'cave': cave_grid,
+    'rooms': room_grid,
+    'corridors': corridor_grid,
+}
+
+
+def generate_map(style, width, height, seed=0, **parameters):
+    """
+    Returns a (width, height) grid of the given style (see MAP_STYLES). The same
+    arguments always give the same grid.
+    """
+    return MAP_STYLES[style](width, height, seed=seed, **parameters)
+
+
+def hole_polygons(width, height, count, vertices=(3, 8), radius=(30, 100), margin=100, seed=0):
+    """
+    Returns count random star-shaped polygons (lists of (x, y)) with centers at least
+    margin away from the border of a width x height level. Each polygon has a vertex
+    count from the vertices range and a radius from the radius range; like
+    random_polygon, its corners are jittered in angle and pulled in by up to 30%.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform([margin, margin], [max(width - margin, margin), max(height - margin, margin)],
+                          size=(count, 2))
+    radii = rng.uniform(radius[0], radius[1], size=count)
+    counts = rng.integers(vertices[0], vertices[1] + 1, size=count)
+
+    polygons = []
+    for center, hole_radius, n in zip(centers, radii, counts.tolist()):
+        step = 2 * np.pi / n
+        angles = step * np.arange(n) + rng.uniform(-step / 4, step / 4, size=n)
+        distances = hole_radius * rng.uniform(0.7, 1.0, size=n)
+        points = center + distances[:, None] * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        polygons.append([tuple(point) for point in points.tolist()])
+    return polygons
+
+
+def generate_level(width, height, holes, vertices=(3, 8), radius=(30, 100), margin=50, seed=0):
+    """
+    Seeded counterpart of generate_random_level_with_holes: triangulates a width x height
+    level with the polygons of hole_polygons cut out. Returns (triangles, holes).
+    """
+    bounding_polygon = [(margin, margin), (width - margin, margin), (width - margin, height - margin),
+                        (margin, height - margin)]
+    polygons = hole_polygons(width, height, holes, vertices, radius, margin=2 * margin, seed=seed)
+    return triangulate_with_holes(bounding_polygon, polygons)
@@ -0,0 +1,263 @@
+import numpy as np
+import triangle as tr
+
+from .locate import PointLocator
+
+# Bits of Mesh.flags(): the triangle is not walkable, and edge k of it is constrained
+FLAG_OBSTACLE = 1
+FLAG_CONSTRAINED_EDGE = (2, 4, 8)
+
+
+class Mesh:
+    """
+    Triangle mesh stored as flat arrays.
+
+    vertices is (n_vertices, 2) float64, triangles is (n_triangles, 3) int32 in
+    counter-clockwise order and neighbors is (n_triangles, 3) int32, where
+    neighbors[t, i] is the triangle across the edge triangles[t, i] -> triangles[t, (i + 1) % 3]
+    or -1 on the border. walkable flags the triangles an expansion may enter, and
+    flags() packs that flag and the constrained edges into one uint8 per triangle.
+    """
+
+    def __init__(self, vertices, triangles, walkable=None):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+        self.triangles = orient_counter_clockwise(self.vertices, np.asarray(triangles, dtype=np.int32))
+        self.neighbors = build_neighbor_array(self.triangles)
+        if walkable is None:
+            walkable = np.ones(len(self.triangles), dtype=bool)
+        self.walkable = np.asarray(walkable, dtype=bool)
+        self._lists = None
+        self._views = None
+        self._locator = None
+        self._constrained = None
+        self._flags = None
+
+    @classmethod
+    def from_arrays(cls, vertices, triangles, neighbors, walkable, constrained=None, buckets=None):
+        """
+        Wraps arrays of an already built mesh (for example memory-mapped from the mesh
+        cache) without copying them or recomputing the topology. triangles must already
+        be counter-clockwise. buckets, if given, is the BucketGrid of its PointLocator.
+        """
+        mesh = cls.__new__(cls)
+        mesh.vertices = vertices
+        mesh.triangles = triangles
+        mesh.neighbors = neighbors
+        mesh.walkable = walkable
+        mesh._lists = None
+        mesh._views = None
+        mesh._locator = PointLocator(mesh, buckets=buckets) if buckets is not None else None
+        mesh._constrained = constrained
+        mesh._flags = None
+        return mesh
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def flat_views(self):
+        """
+        Returns (vertices, triangles, neighbors, walkable) as flat memoryviews over the
+        mesh arrays: vertex i is at 2 * i and 2 * i + 1, corner and neighbor k of triangle
+        t at 3 * t + k. Scalar expansion loops index these about as fast as lists without
+        copying the mesh, so memory-mapped and shared-memory meshes stay shared, and
+        in-place updates of the arrays show through without a refresh.
+        """
+        arrays = (self.vertices, self.triangles, self.neighbors, self.walkable)
+        if self._views is None or any(view is not array for view, array in zip(self._views[0], arrays)):
+            self._views = (arrays, tuple(memoryview(np.ascontiguousarray(array).reshape(-1)) for array in arrays))
+        return self._views[1]
+
+    def as_lists(self):
+        """
+        Returns (vertices, triangles, neighbors, walkable) as plain Python lists, built
+        once per mesh. The expansions read flat_views() instead, which does not copy.
+        """
+        if self._lists is None:
+            self._lists = (
+                [tuple(v) for v in self.vertices.tolist()],
+                self.triangles.tolist(),
+                self.neighbors.tolist(),
+                self.walkable.tolist(),
+            )
+        return self._lists
+
+    def point_locator(self):
+        """
+        Returns the PointLocator shared by queries on this mesh, building it on first use.
+        """
+        if self._locator is None:
+            self._locator = PointLocator(self)
+        return self._locator
+
+    def refresh_rows(self, rows):
+        """
+        Brings the cached views up to date after the arrays were changed in place at
+        the given triangle rows: the plain-list rows are patched and the
+        constrained-edge flags are recomputed on next use.
+        """
+        self._constrained = None
+        self._flags = None
+        if self._lists is None:
+            return
+        _, triangles, neighbors, walkable = self._lists
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        for row, corners, adjacent, flag in zip(rows.tolist(), self.triangles[rows].tolist(),
+                                                self.neighbors[rows].tolist(), self.walkable[rows].tolist()):
+            triangles[row] = corners
+            neighbors[row] = adjacent
+            walkable[row] = flag
+
+    def constrained_edges(self):
+        """
+        Returns an (n_triangles, 3) bool array flagging the edges an expansion cannot
+        cross: edges on the mesh border and edges between walkable and blocked triangles.
+        """
+        if self._constrained is None:
+            across = self.neighbors >= 0
+            other = self.walkable[np.where(across, self.neighbors, 0)]
+            self._constrained = ~across | (other != self.walkable[:, None])
+        return self._constrained
+
+    def flags(self):
+        """
+        Returns an (n_triangles,) uint8 array with FLAG_OBSTACLE set on the triangles that
+        are not walkable and FLAG_CONSTRAINED_EDGE[k] set when edge k is constrained.
+        """
+        if self._flags is None:
+            flags = np.where(self.walkable, 0, FLAG_OBSTACLE).astype(np.uint8)
+            for k, bit in enumerate(FLAG_CONSTRAINED_EDGE):
+                flags[self.constrained_edges()[:, k]] |= bit
+            self._flags = flags
+        return self._flags
+
+
+def orient_counter_clockwise(vertices, triangles):
+    """
+    Returns a contiguous copy of triangles with every row in counter-clockwise order.
+    """
+    triangles = np.array(triangles, dtype=np.int32, order='C')
+    a, b, c = (vertices[triangles[:, i]] for i in range(3))
+    clockwise = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]) < 0
+    triangles[clockwise] = triangles[clockwise][:, [0, 2, 1]]
+    return triangles
+
+
+def build_neighbor_array(triangles):
+    """
+    Builds the (n_triangles, 3) int32 neighbor array of a triangle list.
+    Every directed edge gets an integer key for its unordered vertex pair; after
+    sorting, the two triangles sharing an edge sit next to each other.
+    """
+    n = len(triangles)
+    neighbors = np.full((n, 3), -1, dtype=np.int32)
+    if n == 0:
+        return neighbors
+
+    start = triangles.astype(np.int64)
+    end = np.roll(start, -1, axis=1)
+    keys = (np.minimum(start, end) * (int(triangles.max()) + 1) + np.maximum(start, end)).ravel()
+
+    order = np.argsort(keys, kind='stable')
+    shared = np.flatnonzero(keys[order[1:]] == keys[order[:-1]])
+    first, second = order[shared], order[shared + 1]
+
+    flat = neighbors.reshape(-1)
+    flat[first] = second // 3
+    flat[second] = first // 3
+    return neighbors
+
+
+def mesh_from_triangles(triangles, walkable=None):
+    """
+    Builds a Mesh from triangles given as sequences of three (x, y) points.
+    Row i of the mesh is triangles[i], so indices map straight back to the input list.
+    """
+    point_index = {}
+    indices = []
+    for tri in triangles:
+        indices.append([point_index.setdefault(tuple(point), len(point_index)) for point in tri])
+    vertices = np.array(list(point_index), dtype=np.float64).reshape(-1, 2)
+    return Mesh(vertices, np.array(indices, dtype=np.int32).reshape(-1, 3), walkable)
+
+
+def build_grid_mesh(grid, cell_size):
+    """
+    Triangulates the walkable cells of the grid and returns the resulting Mesh.
+    """
+    cdt = triangulate_grid_with_cdt(grid, cell_size)
+    walkable = classify_walkable_triangles(cdt['vertices'], cdt['triangles'], grid, cell_size)
+    return Mesh(cdt['vertices'], cdt['triangles'], walkable)
+
+
+def trace_wall_segments(grid):
+    """
+    Returns the walls of the grid as an (n, 2, 2) array of segment end points in cell units.
+
+    A wall is a cell side with walkable space on one side and blocked space (or the
+    outside of the grid) on the other. Collinear walls are merged into one maximal
+    segment, which is only cut where a perpendicular wall meets it, so the sides shared
+    by two walkable cells never produce points or constraints.
+    """
+    padded = np.pad(np.asarray(grid, dtype=bool), 1)
+    # horizontal[x, y]: wall along y between x and x + 1; vertical[x, y]: wall along x between y and y + 1
+    horizontal = padded[1:-1, :-1] != padded[1:-1, 1:]
+    vertical = padded[:-1, 1:-1] != padded[1:, 1:-1]
+
+    # Corners touched by a wall running the other way, indexed like the lattice points [x, y]
+    meets_vertical = np.pad(vertical, ((0, 0), (1, 0))) | np.pad(vertical, ((0, 0), (0, 1)))
+    meets_horizontal = np.pad(horizontal, ((1, 0), (0, 0))) | np.pad(horizontal, ((0, 1), (0, 0)))
+
+    def runs(walls, cuts):
+        # walls is indexed [line, position along the line]; a run ends before a missing wall or a cut
+        before = np.pad(walls, ((0, 0), (1, 0)))[:, :-1]
+        after = np.pad(walls, ((0, 0), (0, 1)))[:, 1:]
+        starts = np.nonzero(walls & (~before | cuts[:, :-1]))
+        ends = np.nonzero(walls & (~after | cuts[:, 1:]))
+        return starts[0], starts[1], ends[1] + 1
+
+    y, x0, x1 = runs(horizontal.T, meets_vertical.T)
+    x, y0, y1 = runs(vertical, meets_horizontal)
+    horizontal_segments = np.stack([np.stack([x0, y], axis=1), np.stack([x1, y], axis=1)], axis=1)
+    vertical_segments = np.stack([np.stack([x, y0], axis=1), np.stack([x, y1], axis=1)], axis=1)
+    return np.concatenate([horizontal_segments, vertical_segments]).astype(np.float64)
+
+
+def triangulate_grid_with_cdt(grid, cell_size):
+    """
+    Builds a Constrained Delaunay Triangulation of the walkable cells of the grid.
+    Only the merged wall segments are constrained, so open areas are covered by a few
+    large triangles instead of two triangles per cell.
+    """
+    walls = trace_wall_segments(grid) * cell_size
+    points, segments = np.unique(walls.reshape(-1, 2), axis=0, return_inverse=True)
+    prep_data = dict(vertices=points, segments=segments.reshape(-1, 2))
+    return tr.triangulate(prep_data, 'p')
+
+
+def classify_walkable_triangles(vertices, triangles, grid, cell_size):
+    """
+    Flags the triangles that lie in walkable cells.
+    Every triangle sits entirely inside walkable or blocked space because the walls
+    are constrained, so the cell under its centroid decides.
+    """
+    centroids = vertices[triangles].mean(axis=1)
+    cells = (centroids // cell_size).astype(int)
+    return grid[cells[:, 0], cells[:, 1]]
+
+
+def build_triangle_neighbor_map(triangles):
+    """
+    Maps every triangle, given as a tuple of vertex tuples, to the triangles that share an edge with it.
+    The topology is built once from an edge -> triangles map, so each lookup afterwards is O(1).
+    """
+    edge_to_triangles = {}
+    for tri in triangles:
+        for i in range(3):
+            edge = frozenset((tri[i], tri[(i + 1) % 3]))
+            edge_to_triangles.setdefault(edge, []).append(tri)
+
+    neighbor_map = {tri: [] for tri in triangles}
+    for shared in edge_to_triangles.values():
+        for tri in shared:
+            neighbor_map[tri].extend(other for other in shared if other != tri)
+    return neighbor_map
@@ -0,0 +1,63 @@
+import numpy as np
+
+from .buckets import BucketGrid
+from .dtea import bounding_box, box_intersects_line, line_intersects_triangle
+
+
+class ObstacleIndex:
+    """
+    Uniform-grid acceleration structure over obstacle polygons for d-TEA occlusion tests.
+
+    Build it once after the level is generated. A segment query walks only the
+    buckets the segment passes through and tests the obstacles listed there, so the
+    cost follows the obstacles near the segment instead of the total obstacle count.
+    Boxes are registered with a small padding so obstacles that only touch a bucket
+    border are found from either side.
+    """
+
+    def __init__(self, obstacles, obstacle_boxes=None, bucket_size=None):
+        self.obstacles = obstacles
+        if obstacle_boxes is None:
+            obstacle_boxes = [bounding_box(obs) for obs in obstacles]
+        self.boxes = obstacle_boxes
+
+        boxes = np.asarray(obstacle_boxes, dtype=np.float64).reshape(-1, 4)
+        lower = boxes[:, [0, 2]]
+        upper = boxes[:, [1, 3]]
+        if bucket_size is None and len(boxes):
+            # Buckets about twice the typical obstacle keep each obstacle in a few buckets
+            bucket_size = 2 * float(np.median(np.maximum(upper - lower, 1e-9).max(axis=1)))
+        self.buckets = BucketGrid(lower, upper, bucket_size, padding=1e-9 * (bucket_size or 1.0))
+
+    def candidates(self, p, q):
+        """
+        Returns the indices of the obstacles listed in the buckets along the segment p -> q.
+        """
+        found = []
+        seen = set()
+        for bx, by in self.buckets.buckets_along(p, q):
+            for index in self.buckets.items_in(bx, by).tolist():
+                if index not in seen:
+                    seen.add(index)
+                    found.append(index)
+        return found
+
+    def segment_blocked(self, p, q, stats=None):
+        """
+        Returns True if the segment p -> q crosses any obstacle. A QueryStats given as
+        stats counts the obstacles tested.
+        """
+        seen = set()
+        for bx, by in self.buckets.buckets_along(p, q):
+            for index in self.buckets.items_in(bx, by).tolist():
+                if index in seen:
+                    continue
+                seen.add(index)
+                if box_intersects_line(p, q, self.boxes[index]) and \
+                        line_intersects_triangle(p, q, self.obstacles[index]):
+                    if stats is not None:
+                        stats.obstacle_tests += len(seen)
+                    return True
+        if stats is not None:
+            stats.obstacle_tests += len(seen)
+        return False
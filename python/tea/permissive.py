@@ -0,0 +1,134 @@
+# Quadrant directions (dx, dy); cells on the axes belong to two quadrants and are visited twice
+QUADRANT_DIRECTIONS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+
+
+class _View:
+    """
+    A wedge of lines leaving the source cell, in quadrant coordinates where the source
+    cell is the unit square at the origin. Lines are (start, end) lattice points; the
+    view holds every line above shallow and below steep. The bumps are the blocked
+    corners each line was bent around, as linked (point, parent) tuples.
+    """
+
+    __slots__ = ('shallow', 'steep', 'shallow_bumps', 'steep_bumps')
+
+    def __init__(self, shallow, steep, shallow_bumps=None, steep_bumps=None):
+        self.shallow = shallow
+        self.steep = steep
+        self.shallow_bumps = shallow_bumps
+        self.steep_bumps = steep_bumps
+
+    def copy(self):
+        return _View(self.shallow, self.steep, self.shallow_bumps, self.steep_bumps)
+
+
+def _side(line, point):
+    # Twice the signed area of (start, end, point): positive when point is above the line
+    (sx, sy), (ex, ey) = line
+    return (ex - sx) * (point[1] - sy) - (ey - sy) * (point[0] - sx)
+
+
+def _add_shallow_bump(view, point):
+    # Raise the shallow line to pass above the point, pivoting on any steep bump it would cut
+    view.shallow = (view.shallow[0], point)
+    view.shallow_bumps = (point, view.shallow_bumps)
+    bump = view.steep_bumps
+    while bump is not None:
+        if _side(view.shallow, bump[0]) < 0:
+            view.shallow = (bump[0], point)
+        bump = bump[1]
+
+
+def _add_steep_bump(view, point):
+    # Lower the steep line to pass below the point, pivoting on any shallow bump it would cut
+    view.steep = (view.steep[0], point)
+    view.steep_bumps = (point, view.steep_bumps)
+    bump = view.shallow_bumps
+    while bump is not None:
+        if _side(view.steep, bump[0]) > 0:
+            view.steep = (bump[0], point)
+        bump = bump[1]
+
+
+def _is_dead(view):
+    # A view has closed when its lines coincide and only graze a corner of the source cell
+    shallow = view.shallow
+    return _side(shallow, view.steep[0]) == 0 and _side(shallow, view.steep[1]) == 0 and \
+        (_side(shallow, (0, 1)) == 0 or _side(shallow, (1, 0)) == 0)
+
+
+def permissive_visibility(grid, source):
+    """
+    Computes the cells visible from anywhere in the source cell with precise permissive
+    field of view (Jonathon Duerig's algorithm): a cell is visible when some straight
+    line passes through the inside of the source cell and the inside of the cell
+    without entering a blocked cell. Lines may touch the sides and corners of blocked
+    cells, so this is a superset of the point-to-point line of sight of tea.los between
+    any two points of the cells, which makes it the conservative test a PVS needs.
+
+    Each quadrant is swept in diagonals away from the source while a list of views
+    (wedges of lines still open) is narrowed around the blocked cells; all corners are
+    lattice points, so every test is exact integer arithmetic.
+
+    Returns (visible_cells, visible_walls) as sets of (x, y), like compute_visibility.
+    """
+    width, height = grid.shape
+    ox, oy = source
+    if not grid[ox, oy]:
+        return set(), {(ox, oy)}
+
+    visible_cells = {(ox, oy)}
+    visible_walls = set()
+
+    for dx, dy in QUADRANT_DIRECTIONS:
+        extent_x = width - 1 - ox if dx > 0 else ox
+        extent_y = height - 1 - oy if dy > 0 else oy
+        views = [_View(((0, 1), (extent_x + 1, 0)), ((1, 0), (0, extent_y + 1)))]
+
+        for i in range(1, extent_x + extent_y + 1):
+            if not views:
+                break
+            k = 0
+            for j in range(max(0, i - extent_x), min(i, extent_y) + 1):
+                x, y = i - j, j
+                top_left = (x, y + 1)
+                bottom_right = (x + 1, y)
+                # Views are ordered from shallow to steep, like the cells of a diagonal
+                while k < len(views) and _side(views[k].steep, bottom_right) >= 0:
+                    k += 1
+                if k == len(views):
+                    break
+                view = views[k]
+                if _side(view.shallow, top_left) <= 0:
+                    continue
+
+                cell = (ox + x * dx, oy + y * dy)
+                if grid[cell]:
+                    visible_cells.add(cell)
+                    continue
+                visible_walls.add(cell)
+
+                cuts_shallow = _side(view.shallow, bottom_right) < 0
+                cuts_steep = _side(view.steep, top_left) > 0
+                if cuts_shallow and cuts_steep:
+                    del views[k]
+                elif cuts_shallow:
+                    _add_shallow_bump(view, top_left)
+                    if _is_dead(view):
+                        del views[k]
+                elif cuts_steep:
+                    _add_steep_bump(view, bottom_right)
+                    if _is_dead(view):
+                        del views[k]
+                else:
+                    # The cell splits the view into a part below it and a part above it
+                    steep_view = view.copy()
+                    views.insert(k + 1, steep_view)
+                    _add_steep_bump(view, bottom_right)
+                    _add_shallow_bump(steep_view, top_left)
+                    if _is_dead(steep_view):
+                        del views[k + 1]
+                    if _is_dead(view):
+                        del views[k]
+
+    return visible_cells, visible_walls
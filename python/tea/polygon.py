@@ -0,0 +1,189 @@
+import math
+
+import numpy as np
+
+from .expansion import nudge_observer, iterative_visibility_expansion
+from .geometry import orient, clip_edge_to_window, check_view_cone
+from .containment import points_in_polygon
+from .locate import find_observer_triangle
+
+# Largest angle in radians between consecutive vertices of the arcs that stand in for
+# the range circle in clipped polygons
+ARC_STEP = math.pi / 32
+
+
+def visibility_polygon(mesh, observer, visibility_range=None, arc_step=ARC_STEP, heading=None, half_angle=None,
+                       stats=None):
+    """
+    Returns the exact visibility polygon of the observer as an (n, 2) float64 array of
+    vertices in counter-clockwise order around the observer, or an empty array if the
+    observer is outside the walkable mesh. With a visibility_range the expansion stops
+    at the range circle and the polygon is clipped to it (see clip_polygon_to_circle).
+    With a heading only the view cone of half_angle radians around it is expanded, and
+    the polygon runs from the cone's clockwise ray to its counter-clockwise ray and back
+    through the observer. A QueryStats given as stats receives the counters and phase
+    times of the expansion.
+
+    The triangular expansion reports every wall edge its view window reaches; the part
+    of each edge inside the window is a piece of the polygon boundary. Sorted by angle,
+    consecutive pieces either share an end point or are joined by a shadow ray, so the
+    polygon only has a vertex where a wall and a ray meet: collinear pieces of one wall
+    are merged into one side.
+    """
+    check_view_cone(heading, half_angle)
+    if stats is None:
+        observer_triangle_index = find_observer_triangle(mesh, observer)
+    else:
+        with stats.timer('locate'):
+            observer_triangle_index = find_observer_triangle(mesh, observer)
+    if observer_triangle_index is None or not mesh.walkable[observer_triangle_index]:
+        return np.zeros((0, 2))
+
+    boundary = []
+    iterative_visibility_expansion(mesh, observer_triangle_index, observer, boundary, stats=stats,
+                                   visibility_range=visibility_range, heading=heading, half_angle=half_angle)
+    vertices, triangles, _, _ = mesh.flat_views()
+    base = 3 * observer_triangle_index
+    q = nudge_observer(observer, [(vertices[2 * i], vertices[2 * i + 1]) for i in triangles[base:base + 3]])
+    cone = heading is not None and half_angle < math.pi
+    first_angle = heading - half_angle if cone else -math.pi
+
+    pieces = []
+    for u, v, r, l in boundary:
+        piece = clip_edge_to_window(q, (vertices[2 * u], vertices[2 * u + 1]), (vertices[2 * v], vertices[2 * v + 1]),
+                                    r, l)
+        if piece is not None:
+            pieces.append(piece)
+
+    scale = max([abs(c) for piece in pieces for point in piece for c in point] + [1.0])
+    tolerance = 1e-9 * scale
+
+    def same(p, s):
+        return abs(p[0] - s[0]) <= tolerance and abs(p[1] - s[1]) <= tolerance
+
+    # Pieces of edges that only touch a window ray have no length, and their rounded
+    # angles could interleave with the pieces around them
+    pieces = [piece for piece in pieces if not same(*piece)]
+
+    def angular_order(piece):
+        # Angle from the first direction; a piece starting on the cone's first ray may round to just below it
+        turn = (math.atan2(piece[0][1] - q[1], piece[0][0] - q[0]) - first_angle) % (2 * math.pi)
+        return turn - 2 * math.pi if turn > 2 * math.pi - 1e-9 else turn
+
+    pieces.sort(key=angular_order)
+
+    def straight(a, b, c):
+        # b lies on the segment a -> c
+        return abs(orient(a, b, c)) <= tolerance * scale and \
+            (b[0] - a[0]) * (c[0] - b[0]) + (b[1] - a[1]) * (c[1] - b[1]) >= 0
+
+    polygon = []
+    for a, b in pieces:
+        for point in (a, b):
+            if polygon and same(polygon[-1], point):
+                continue
+            while len(polygon) >= 2 and straight(polygon[-2], polygon[-1], point):
+                polygon.pop()
+            polygon.append(point)
+    if cone and polygon:
+        polygon.append(q)
+
+    # Close the loop: drop a repeated start and straight vertices around it
+    if len(polygon) > 1 and same(polygon[0], polygon[-1]):
+        polygon.pop()
+    changed = True
+    while changed and len(polygon) > 3:
+        changed = False
+        if straight(polygon[-2], polygon[-1], polygon[0]):
+            polygon.pop()
+            changed = True
+        elif straight(polygon[-1], polygon[0], polygon[1]):
+            polygon.pop(0)
+            changed = True
+
+    polygon = np.array(polygon, dtype=np.float64).reshape(-1, 2)
+    if visibility_range is not None:
+        polygon = clip_polygon_to_circle(polygon, observer, visibility_range, arc_step)
+    return polygon
+
+
+def circle_arc(center, radius, start, end=None, arc_step=ARC_STEP):
+    """
+    Returns the points strictly between start and end on the circle, going
+    counter-clockwise, at most arc_step radians apart. With end=None the arc is the
+    full circle, and start is included.
+    """
+    first = math.atan2(start[1] - center[1], start[0] - center[0])
+    if end is None:
+        sweep = 2 * math.pi
+    else:
+        sweep = (math.atan2(end[1] - center[1], end[0] - center[0]) - first) % (2 * math.pi)
+    count = math.ceil(sweep / arc_step)
+    return [(center[0] + radius * math.cos(first + sweep * i / count),
+             center[1] + radius * math.sin(first + sweep * i / count))
+            for i in range(0 if end is None else 1, count)]
+
+
+def clip_polygon_to_circle(polygon, center, radius, arc_step=ARC_STEP):
+    """
+    Returns the part of a counter-clockwise polygon inside the circle as an (n, 2)
+    float64 array, with the circle's arcs approximated by vertices at most arc_step
+    radians apart. The polygon must meet the disk in one piece, which holds for convex
+    polygons and for polygons star-shaped around the center such as visibility
+    polygons; the result is empty if they do not meet.
+
+    Every edge is cut to its chord through the disk by solving |a + t (b - a) - c|^2 =
+    r^2; where the boundary leaves the circle and enters it again, the two points are
+    joined by the counter-clockwise arc between them.
+    """
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    cx, cy = float(center[0]), float(center[1])
+    radius_squared = radius * radius
+
+    # (point, whether the boundary leaves the circle there)
+    points = []
+    for a, b in zip(polygon.tolist(), np.roll(polygon, -1, axis=0).tolist()):
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        fx, fy = a[0] - cx, a[1] - cy
+        qa = dx * dx + dy * dy
+        if qa == 0:
+            continue
+        qb = fx * dx + fy * dy
+        discriminant = qb * qb - qa * (fx * fx + fy * fy - radius_squared)
+        if discriminant <= 0:
+            continue
+        root = math.sqrt(discriminant)
+        t0, t1 = (-qb - root) / qa, (-qb + root) / qa
+        lo, hi = max(t0, 0.0), min(t1, 1.0)
+        if lo >= hi:
+            continue
+        start = (a[0] + lo * dx, a[1] + lo * dy)
+        if not points or points[-1][0] != start or points[-1][1]:
+            points.append((start, False))
+        points.append(((a[0] + hi * dx, a[1] + hi * dy), t1 < 1.0))
+    if len(points) > 1 and points[0][0] == points[-1][0] and not points[-1][1]:
+        points.pop()
+
+    if not points:
+        if len(polygon) >= 3 and points_in_polygon([(cx, cy)], polygon)[0]:
+            return np.array(circle_arc((cx, cy), radius, (cx + radius, cy), arc_step=arc_step), dtype=np.float64)
+        return np.zeros((0, 2))
+
+    clipped = []
+    for i, (point, leaves) in enumerate(points):
+        clipped.append(point)
+        if leaves:
+            clipped.extend(circle_arc((cx, cy), radius, point, points[(i + 1) % len(points)][0], arc_step))
+    return np.array(clipped, dtype=np.float64).reshape(-1, 2)
+
+
+def clip_triangles_to_circle(corners, center, radius, arc_step=ARC_STEP):
+    """
+    Returns the parts of the triangles inside the circle, one (n, 2) float64 array per
+    triangle (empty for triangles outside it). corners is an (N, 3, 2) array in
+    counter-clockwise order, for example mesh.vertices[mesh.triangles[reached]] for the
+    triangles a range-limited d-TEA query reached; together the parts form the visible
+    region inside the range.
+    """
+    return [clip_polygon_to_circle(triangle, center, radius, arc_step)
+            for triangle in np.asarray(corners, dtype=np.float64).reshape(-1, 3, 2)]
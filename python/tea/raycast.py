@@ -0,0 +1,72 @@
+import time
+from collections import deque
+
+from .los import first_blocking_cell
+
+
+def is_cell_visible(grid, observer, target, stats=None, touched=None):
+    """
+    Checks if the target cell is visible from the observer's cell by walking the cells
+    crossed by the line between their centers. A wall is visible when it is the first
+    blocked cell on that line. A set given as touched receives the cells the walk read
+    (see first_blocking_cell).
+    """
+    if tuple(observer) == tuple(target):
+        return True
+    start = (observer[0] + 0.5, observer[1] + 0.5)
+    end = (target[0] + 0.5, target[1] + 0.5)
+    if stats is None:
+        blocker = first_blocking_cell(grid, start, end, touched=touched)
+    else:
+        with stats.timer('los'):
+            blocker = first_blocking_cell(grid, start, end, stats, touched)
+    return blocker is None or blocker == tuple(target)
+
+
+def compute_visibility(grid, observer, stats=None, visibility_range=None, touched=None):
+    """
+    Computes visible cells using a BFS approach from the observer's cell.
+    Returns both the visible cells and the blocking walls that are visible.
+    A QueryStats given as stats receives the phase times and counters, with cells
+    standing in for triangles. With a visibility_range (in cells) only cells whose
+    centers are that close to the observer's center are tested.
+
+    A set given as touched receives every cell whose state the query read: the visible
+    cells and walls and all cells the line-of-sight walks crossed or checked beside a
+    corner. The result can only change when one of those cells changes.
+    """
+    if stats is not None:
+        started = time.perf_counter()
+    width, height = grid.shape
+    visible_cells = set()
+    visible_walls = set()
+    queue = deque([tuple(observer)])
+    visited = set()
+    ox, oy = observer
+    range_squared = None if visibility_range is None else visibility_range * visibility_range
+
+    while queue:
+        x, y = queue.popleft()
+        if (x, y) in visited:
+            continue
+        visited.add((x, y))
+        if range_squared is not None and (x - ox) ** 2 + (y - oy) ** 2 > range_squared:
+            continue
+
+        if is_cell_visible(grid, observer, (x, y), stats, touched):
+            if touched is not None:
+                touched.add((x, y))
+            if grid[x, y]:
+                visible_cells.add((x, y))
+                # Check the 4 adjacent cells (up, down, left, right)
+                for nx, ny in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
+                    if 0 <= nx < width and 0 <= ny < height:
+                        queue.append((nx, ny))
+            else:
+                visible_walls.add((x, y))
+
+    if stats is not None:
+        stats.triangles_popped += len(visited)
+        stats.triangles_accepted += len(visible_cells) + len(visible_walls)
+        stats.times['expansion'] += time.perf_counter() - started
+    return visible_cells, visible_walls
@@ -0,0 +1,129 @@
+import numpy as np
+
+# Upper bound on the number of (segment, obstacle edge) pairs tested at once; larger
+# batches are split into blocks of segments so the temporaries stay in cache.
+SEGMENT_BLOCK = 1 << 16
+
+
+def segment_edge_crossings(p, q, starts, ends, deltas=None):
+    """
+    Vectorized form of the test in line_intersects_triangle. p and q are (..., 2)
+    segment end points, starts and ends (..., 2) edge end points; all four broadcast
+    against each other. Returns a bool array of the broadcast shape, True where the
+    segment p -> q crosses the edge. Every comparison multiplies the same differences
+    as the scalar ccw test, so both give identical answers. deltas may hold the
+    precomputed ends - starts.
+    """
+    p = np.asarray(p, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    if deltas is None:
+        deltas = ends - starts
+    sx, sy = starts[..., 0], starts[..., 1]
+    ex, ey = ends[..., 0], ends[..., 1]
+    dx, dy = deltas[..., 0], deltas[..., 1]
+    px, py, qx, qy = p[..., 0], p[..., 1], q[..., 0], q[..., 1]
+
+    # ccw(a, b, c) is (c.y - a.y) * (b.x - a.x) > (b.y - a.y) * (c.x - a.x)
+    psx, psy, qsx, qsy = px - sx, py - sy, qx - sx, qy - sy
+    sides_of_segment = (qsy * psx > psy * qsx) != ((qy - ey) * (px - ex) > (py - ey) * (qx - ex))
+    sides_of_edge = (psy * dx > dy * psx) != (qsy * dx > dy * qsx)
+    return sides_of_segment & sides_of_edge
+
+
+class ObstacleEdges:
+    """
+    The edges of a list of obstacle polygons (triangles, grid quads or any vertex
+    count) as flat arrays, built once so a segment test is a few array operations.
+
+    starts and ends are (E, 2) float64 arrays with the edges of obstacle i in rows
+    offsets[i]:offsets[i + 1], owner the obstacle of every edge, and lower and upper
+    the corners of each edge's bounding box. Segments are first compared with those
+    boxes, and only the overlapping (segment, edge) pairs get the exact crossing test.
+
+    Like ObstacleIndex it has segment_blocked(p, q, stats), so it can stand in for one
+    wherever d-TEA takes an obstacle_index. It scans every edge box instead of walking
+    buckets, which suits levels of a few hundred obstacles and batches of segments.
+    """
+
+    def __init__(self, obstacles):
+        self.obstacles = obstacles
+        counts = np.array([len(obs) for obs in obstacles], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.owner = np.repeat(np.arange(len(obstacles)), counts)
+        corners = np.array([point for obs in obstacles for point in obs], dtype=np.float64).reshape(-1, 2)
+        # The edge leaving each corner ends at the next corner of the same polygon
+        following = np.arange(len(corners)) + 1
+        following[self.offsets[1:][counts > 0] - 1] = self.offsets[:-1][counts > 0]
+        self.starts = corners
+        self.ends = corners[following]
+        self.deltas = self.ends - self.starts
+        self.lower = np.minimum(self.starts, self.ends)
+        self.upper = np.maximum(self.starts, self.ends)
+
+    def __len__(self):
+        return len(self.obstacles)
+
+    def crossing_pairs(self, p, q):
+        """
+        Tests K segments p -> q ((K, 2) arrays) against all edges and returns the
+        (segment, edge) index arrays of the crossing pairs. Segments are processed in
+        blocks so the box comparison never holds more than SEGMENT_BLOCK pairs.
+        """
+        p = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+        q = np.asarray(q, dtype=np.float64).reshape(-1, 2)
+        if len(self.starts) == 0 or len(p) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        segment_lower = np.minimum(p, q)
+        segment_upper = np.maximum(p, q)
+
+        found_segments = []
+        found_edges = []
+        block = max(1, SEGMENT_BLOCK // len(self.starts))
+        for start in range(0, len(p), block):
+            low = segment_lower[start:start + block, None, :]
+            high = segment_upper[start:start + block, None, :]
+            near = ((self.lower[:, 0] <= high[..., 0]) & (self.upper[:, 0] >= low[..., 0]) &
+                    (self.lower[:, 1] <= high[..., 1]) & (self.upper[:, 1] >= low[..., 1]))
+            segments, edges = np.nonzero(near)
+            segments += start
+            hit = segment_edge_crossings(p[segments], q[segments], self.starts[edges], self.ends[edges],
+                                         self.deltas[edges])
+            found_segments.append(segments[hit])
+            found_edges.append(edges[hit])
+        return np.concatenate(found_segments), np.concatenate(found_edges)
+
+    def blocked_mask(self, p, q):
+        """
+        Returns the (K, N) bool mask of which of the K segments p -> q crosses which obstacle.
+        """
+        p = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+        mask = np.zeros((len(p), len(self.obstacles)), dtype=bool)
+        segments, edges = self.crossing_pairs(p, q)
+        mask[segments, self.owner[edges]] = True
+        return mask
+
+    def segments_blocked(self, p, q):
+        """
+        Returns the (K,) bool mask of which of the K segments p -> q cross any obstacle.
+        """
+        p = np.asarray(p, dtype=np.float64).reshape(-1, 2)
+        blocked = np.zeros(len(p), dtype=bool)
+        blocked[self.crossing_pairs(p, q)[0]] = True
+        return blocked
+
+    def segment_blocked(self, p, q, stats=None):
+        """
+        Returns True if the segment p -> q crosses any obstacle. A QueryStats given as
+        stats counts the obstacles tested.
+        """
+        if stats is not None:
+            stats.obstacle_tests += len(self.obstacles)
+        lower_x, upper_x = (p[0], q[0]) if p[0] <= q[0] else (q[0], p[0])
+        lower_y, upper_y = (p[1], q[1]) if p[1] <= q[1] else (q[1], p[1])
+        near = np.flatnonzero((self.lower[:, 0] <= upper_x) & (self.upper[:, 0] >= lower_x) &
+                              (self.lower[:, 1] <= upper_y) & (self.upper[:, 1] >= lower_y))
+        if len(near) == 0:
+            return False
+        return bool(segment_edge_crossings(p, q, self.starts[near], self.ends[near], self.deltas[near]).any())
@@ -0,0 +1,167 @@
+import bisect
+import itertools
+import threading
+import time
+
+# Counters a query can report, in the order they are exported
+QUERY_COUNTERS = (
+    'triangles_popped',
+    'triangles_accepted',
+    'edges_blocked',
+    'edges_out_of_range',
+    'edges_occluded',
+    'los_checks',
+    'los_steps',
+    'obstacle_tests',
+)
+
+# Phases a query can spend time in
+QUERY_PHASES = ('locate', 'expansion', 'los', 'obstacles')
+
+# Upper bounds of the histogram buckets: powers of two for counters and for times from a microsecond to about 17 s
+COUNTER_BUCKETS = tuple(float(2 ** k) for k in range(25))
+TIME_BUCKETS = tuple(1e-6 * 2 ** k for k in range(25))
+
+
+class QueryStats:
+    """
+    Counters and phase timers of one visibility query.
+
+    Pass an instance as the stats argument of a query function to fill it in; the
+    functions only touch it when one is given, so queries without stats run the same
+    code as before. Counters (see QUERY_COUNTERS):
+
+    triangles_popped / triangles_accepted: expansion steps taken and triangles (or
+    cells) reported visible. edges_blocked: edges not crossed because the other side is
+    a wall or the mesh border. edges_out_of_range / edges_occluded: edges rejected by
+    the d-TEA range test or by the view window / occlusion test. los_checks / los_steps:
+    grid line-of-sight tests and the cells they walked. obstacle_tests: obstacle
+    polygons tested against sight lines.
+
+    times holds the seconds spent in each phase of QUERY_PHASES. Phases can nest (LOS
+    time is part of the expansion time of a flood fill that runs LOS tests).
+    """
+
+    __slots__ = QUERY_COUNTERS + ('times',)
+
+    def __init__(self):
+        for name in QUERY_COUNTERS:
+            setattr(self, name, 0)
+        self.times = dict.fromkeys(QUERY_PHASES, 0.0)
+
+    def timer(self, phase):
+        """
+        Returns a context manager that adds the time spent inside it to the phase.
+        """
+        return _PhaseTimer(self.times, phase)
+
+    def as_dict(self):
+        """
+        Returns the counters and phase times as a plain dict.
+        """
+        result = {name: getattr(self, name) for name in QUERY_COUNTERS}
+        result.update({f'{phase}_seconds': seconds for phase, seconds in self.times.items()})
+        return result
+
+
+class _PhaseTimer:
+    __slots__ = ('times', 'phase', 'started')
+
+    def __init__(self, times, phase):
+        self.times = times
+        self.phase = phase
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.times[self.phase] += time.perf_counter() - self.started
+
+
+class Histogram:
+    """
+    Histogram over fixed bucket bounds: counts[i] is the number of observations in
+    (bounds[i - 1], bounds[i]] and counts[-1] those above the last bound.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """
+        Returns [(upper bound, observations <= bound)] as exported to Prometheus.
+        """
+        return list(zip(self.bounds, itertools.accumulate(self.counts[:-1])))
+
+
+class StatsHistograms:
+    """
+    Aggregates QueryStats of many queries into one histogram per counter and phase,
+    labelled by query kind (for example 'tea' or 'dtea'). Thread safe, so a
+    long-running process can record from its workers and serve prometheus_text() from
+    a metrics endpoint.
+    """
+
+    def __init__(self, prefix='tea_query'):
+        self.prefix = prefix
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def record(self, stats, kind='tea'):
+        """
+        Adds the counters and phase times of one query.
+        """
+        with self.lock:
+            for name in QUERY_COUNTERS:
+                self._histogram(kind, name, COUNTER_BUCKETS).observe(getattr(stats, name))
+            for phase, seconds in stats.times.items():
+                self._histogram(kind, f'{phase}_seconds', TIME_BUCKETS).observe(seconds)
+
+    def _histogram(self, kind, name, bounds):
+        key = (kind, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(bounds)
+        return histogram
+
+    def snapshot(self):
+        """
+        Returns {kind: {metric: dict(count, sum, buckets)}} with buckets as [(upper bound, cumulative count)].
+        """
+        with self.lock:
+            result = {}
+            for (kind, name), histogram in self.histograms.items():
+                result.setdefault(kind, {})[name] = dict(count=histogram.count, sum=histogram.sum,
+                                                          buckets=histogram.cumulative())
+            return result
+
+    def prometheus_text(self):
+        """
+        Returns the histograms in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            for name in sorted({name for _, name in self.histograms}):
+                metric = f'{self.prefix}_{name}'
+                lines.append(f'# TYPE {metric} histogram')
+                for (kind, other), histogram in sorted(self.histograms.items()):
+                    if other != name:
+                        continue
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{kind="{kind}",le="{_format(bound)}"}} {count}')
+                    lines.append(f'{metric}_bucket{{kind="{kind}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{kind="{kind}"}} {_format(histogram.sum)}')
+                    lines.append(f'{metric}_count{{kind="{kind}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format(value):
+    return repr(float(value))
@@ -0,0 +1,259 @@
+import numpy as np
+import triangle as tr
+
+from .buckets import BucketGrid
+from .locate import PointLocator
+from .mesh import Mesh, orient_counter_clockwise, build_neighbor_array, trace_wall_segments, \
+    classify_walkable_triangles
+
+
+class TiledGridMesh:
+    """
+    Grid mesh that can be patched when cells change, for doors and destructible walls.
+
+    The grid is cut into tiles of tile_size x tile_size cells that are triangulated
+    independently. Tile borders are constrained at every cell corner, so the triangles
+    on both sides of a border always meet edge to edge, and a tile holding at most
+    tile_size ** 2 cells never needs more than 2 * tile_size ** 2 triangles. Every tile
+    owns that many rows of the mesh arrays, so re-triangulating one tile only rewrites
+    its own rows and the neighbor entries across its border; no other index moves.
+    Unused rows are dead: they are not walkable, have no neighbors and are never
+    returned by point location.
+
+    All mesh vertices are cell corners, so vertices holds every corner of the grid and
+    corner (x, y) is vertex x * (height + 1) + y.
+    """
+
+    def __init__(self, grid, cell_size, tile_size=16):
+        self.grid = np.array(grid, dtype=bool)
+        self.cell_size = cell_size
+        self.tile_size = tile_size
+        width, height = self.grid.shape
+        self.tiles_x = -(-width // tile_size)
+        self.tiles_y = -(-height // tile_size)
+        self.capacity = 2 * tile_size * tile_size
+
+        corners = np.stack(np.meshgrid(np.arange(width + 1), np.arange(height + 1), indexing='ij'), axis=-1)
+        vertices = corners.reshape(-1, 2).astype(np.float64) * cell_size
+        rows = self.tiles_x * self.tiles_y * self.capacity
+        self.mesh = Mesh.from_arrays(vertices, np.zeros((rows, 3), dtype=np.int32),
+                                     np.full((rows, 3), -1, dtype=np.int32), np.zeros(rows, dtype=bool))
+        self.tile_rows = np.zeros(self.tiles_x * self.tiles_y, dtype=np.int64)
+
+        # (row, edge) of the triangle on each side of every unit edge on a grid line, indexed
+        # [side, position along the line, line]; side 0 holds the cells before the line
+        self.horizontal_owner = np.full((2, width, height + 1, 2), -1, dtype=np.int64)
+        self.vertical_owner = np.full((2, height, width + 1, 2), -1, dtype=np.int64)
+
+        self.locator = TiledPointLocator(self)
+        self.mesh._locator = self.locator
+        for tile in range(len(self.tile_rows)):
+            self.build_tile(tile)
+
+    def tile_bounds(self, tile):
+        """
+        Returns the cell range (x0, y0, x1, y1) covered by the tile.
+        """
+        width, height = self.grid.shape
+        tx, ty = divmod(tile, self.tiles_y)
+        x0, y0 = tx * self.tile_size, ty * self.tile_size
+        return x0, y0, min(x0 + self.tile_size, width), min(y0 + self.tile_size, height)
+
+    def tile_of_cell(self, x, y):
+        """
+        Returns the index of the tile containing cell (x, y).
+        """
+        return (x // self.tile_size) * self.tiles_y + y // self.tile_size
+
+    def live_rows(self, tile):
+        """
+        Returns the mesh rows holding the current triangles of the tile.
+        """
+        start = tile * self.capacity
+        return np.arange(start, start + self.tile_rows[tile])
+
+    def triangulate_tile(self, tile):
+        """
+        Triangulates one tile and returns its counter-clockwise triangles as vertex indices.
+        The tile border is constrained at every cell corner and the walls inside the tile
+        are constrained as merged segments.
+        """
+        x0, y0, x1, y1 = self.tile_bounds(tile)
+        w, h = x1 - x0, y1 - y0
+
+        walls = trace_wall_segments(self.grid[x0:x1, y0:y1]).astype(np.int64)
+        xs, ys = walls[:, :, 0], walls[:, :, 1]
+        on_border = ((xs == 0) | (xs == w)).all(axis=1) & (xs[:, 0] == xs[:, 1]) | \
+                    ((ys == 0) | (ys == h)).all(axis=1) & (ys[:, 0] == ys[:, 1])
+        walls = walls[~on_border]
+
+        # Corners around the tile in counter-clockwise order, joined into unit border segments
+        steps_x, steps_y = np.arange(w), np.arange(h)
+        border = np.concatenate([
+            np.stack([steps_x, np.zeros(w, dtype=np.int64)], axis=1),
+            np.stack([np.full(h, w), steps_y], axis=1),
+            np.stack([w - steps_x, np.full(w, h)], axis=1),
+            np.stack([np.zeros(h, dtype=np.int64), h - steps_y], axis=1),
+        ])
+        border_segments = np.stack([border, np.roll(border, -1, axis=0)], axis=1)
+
+        segments = np.concatenate([border_segments, walls])
+        points, index = np.unique(segments.reshape(-1, 2), axis=0, return_inverse=True)
+        cdt = tr.triangulate(dict(vertices=points.astype(np.float64), segments=index.reshape(-1, 2)), 'p')
+
+        local = np.rint(cdt['vertices']).astype(np.int64)
+        height = self.grid.shape[1]
+        vertex_ids = (local[:, 0] + x0) * (height + 1) + local[:, 1] + y0
+        return orient_counter_clockwise(self.mesh.vertices, vertex_ids[cdt['triangles']])
+
+    def build_tile(self, tile):
+        """
+        Re-triangulates the tile into its rows of the mesh and links it to the tiles
+        around it. Returns the mesh rows that changed.
+        """
+        mesh = self.mesh
+        triangles = self.triangulate_tile(tile)
+        start = tile * self.capacity
+        old_count = self.tile_rows[tile]
+        count = len(triangles)
+        rows = np.arange(start, start + count)
+
+        mesh.triangles[rows] = triangles
+        mesh.walkable[rows] = classify_walkable_triangles(mesh.vertices, triangles, self.grid, self.cell_size)
+        local = build_neighbor_array(triangles)
+        mesh.neighbors[rows] = np.where(local >= 0, local + start, -1)
+
+        dead = np.arange(start + count, start + old_count)
+        mesh.triangles[dead] = 0
+        mesh.walkable[dead] = False
+        mesh.neighbors[dead] = -1
+        self.tile_rows[tile] = count
+
+        partners = self.link_border(tile, rows)
+        self.locator.rebuild_tile(tile, rows)
+        return np.concatenate([rows, dead, partners])
+
+    def link_border(self, tile, rows):
+        """
+        Registers the border edges of the tile's triangles and connects them to the
+        triangles across the border. Returns the rows on the other side that were patched.
+        """
+        mesh = self.mesh
+        x0, y0, x1, y1 = self.tile_bounds(tile)
+        stride = self.grid.shape[1] + 1
+        row_index, edge = np.nonzero(mesh.neighbors[rows] < 0)
+        row_index = rows[row_index]
+        a = mesh.triangles[row_index, edge]
+        b = mesh.triangles[row_index, (edge + 1) % 3]
+        ax, ay = np.divmod(a, stride)
+        bx, by = np.divmod(b, stride)
+
+        partners = []
+        for owner, on_line, line, along, low, high in (
+                (self.horizontal_owner, ay == by, ay, np.minimum(ax, bx), y0, y1),
+                (self.vertical_owner, ax == bx, ax, np.minimum(ay, by), x0, x1)):
+            # The tile lies after its low border line (side 1) and before its high one (side 0)
+            for side, border_line in ((1, low), (0, high)):
+                hit = on_line & (line == border_line)
+                keys = (along[hit], line[hit])
+                own_rows, own_edges = row_index[hit], edge[hit]
+                owner[side][keys] = np.stack([own_rows, own_edges], axis=1)
+                other = owner[1 - side][keys]
+                linked = other[:, 0] >= 0
+                mesh.neighbors[own_rows, own_edges] = np.where(linked, other[:, 0], -1)
+                mesh.neighbors[other[linked, 0], other[linked, 1]] = own_rows[linked]
+                partners.append(other[linked, 0])
+        return np.concatenate(partners)
+
+    def update_cells(self, changes):
+        """
+        Applies cell changes, given as {(x, y): walkable} or an iterable of ((x, y), walkable)
+        pairs, and re-triangulates only the tiles whose cells changed. The mesh, its
+        neighbor array and its point location are patched in place. Returns the indices
+        of the rebuilt tiles. Raises ValueError, before changing anything, if a cell lies
+        outside the grid.
+        """
+        changes = dict(changes)
+        width, height = self.grid.shape
+        for x, y in changes:
+            if not (0 <= x < width and 0 <= y < height):
+                raise ValueError(f'cell ({x}, {y}) is outside the {width}x{height} grid')
+
+        tiles = set()
+        for (x, y), walkable in changes.items():
+            if self.grid[x, y] != bool(walkable):
+                self.grid[x, y] = walkable
+                tiles.add(self.tile_of_cell(x, y))
+
+        changed = [self.build_tile(tile) for tile in sorted(tiles)]
+        if changed:
+            self.mesh.refresh_rows(np.concatenate(changed))
+            self.locator.last_triangle = None
+        return sorted(tiles)
+
+
+class TiledPointLocator(PointLocator):
+    """
+    PointLocator for a TiledGridMesh. Every tile keeps its own small BucketGrid over its
+    live triangles, so a tile rebuild only re-indexes that tile.
+    """
+
+    def __init__(self, tiled_mesh, max_walk_steps=64):
+        self.mesh = tiled_mesh.mesh
+        self.tiled_mesh = tiled_mesh
+        self.max_walk_steps = max_walk_steps
+        self.last_triangle = None
+        self.tile_buckets = [None] * (tiled_mesh.tiles_x * tiled_mesh.tiles_y)
+
+    def rebuild_tile(self, tile, rows):
+        """
+        Re-indexes the triangles in the given rows as the content of the tile.
+        """
+        corners = self.mesh.vertices[self.mesh.triangles[rows]]
+        buckets = BucketGrid(corners.min(axis=1), corners.max(axis=1), self.tiled_mesh.cell_size)
+        self.tile_buckets[tile] = (buckets, rows.astype(np.int32))
+
+    def candidates(self, point):
+        """
+        Returns the indices of the triangles whose bounding box overlaps the point's bucket in its tile.
+        """
+        tiled = self.tiled_mesh
+        width, height = tiled.grid.shape
+        # Points outside the grid are clamped to a border tile, where no triangle contains them
+        x = min(max(int(point[0] // tiled.cell_size), 0), width - 1)
+        y = min(max(int(point[1] // tiled.cell_size), 0), height - 1)
+        buckets, rows = self.tile_buckets[tiled.tile_of_cell(x, y)]
+        return rows[buckets.items_in(*buckets.bucket_of(point))]
+
+    def candidate_pairs(self, points):
+        """
+        Vectorized candidates: points are grouped by tile and looked up in that tile's
+        buckets. Returns (point_ids, triangles) like PointLocator.candidate_pairs.
+        """
+        tiled = self.tiled_mesh
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cells = np.floor(points / tiled.cell_size).astype(np.int64)
+        cells = np.clip(cells, 0, np.array(tiled.grid.shape) - 1)
+        point_tiles = tiled.tile_of_cell(cells[:, 0], cells[:, 1])
+
+        point_ids, triangles = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int32)]
+        for tile in np.unique(point_tiles).tolist():
+            members = np.flatnonzero(point_tiles == tile)
+            buckets, rows = self.tile_buckets[tile]
+            local_ids, items = buckets.items_of_points(points[members])
+            point_ids.append(members[local_ids])
+            triangles.append(rows[items])
+        return np.concatenate(point_ids), np.concatenate(triangles)
+
+    @property
+    def buckets(self):
+        """
+        A single BucketGrid over all live triangles, for code that needs the whole index
+        (the mesh cache and the shared-memory pool).
+        """
+        tiled = self.tiled_mesh
+        live = np.concatenate([tiled.live_rows(tile) for tile in range(len(tiled.tile_rows))])
+        corners = self.mesh.vertices[self.mesh.triangles[live]]
+        full = BucketGrid(corners.min(axis=1), corners.max(axis=1))
+        return BucketGrid.from_arrays(full.origin, full.bucket_size, (full.nx, full.ny), full.start,
+                                      live[full.items].astype(np.int32))
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from .expansion import triangular_expansion_cdt
+from .raycast import compute_visibility
+
+
+class VisibilityCache:
+    """
+    Bounded least-recently-used cache of visibility results.
+
+    Keys are any hashable description of a query, typically (version, observer cell
+    or triangle, range). Along with its result every entry records the regions it
+    depends on (cells, tiles, ... any hashable), so an edit only drops the entries
+    whose results touch the edited regions. hits, misses, evictions and
+    invalidations count what the cache did.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.by_region = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, compute):
+        """
+        Returns the cached result for key. On a miss compute() is called; it returns
+        (result, regions) and the result is stored, evicting the least recently used
+        entry when the cache is full.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+
+        self.misses += 1
+        result, regions = compute()
+        regions = frozenset(regions)
+        self.entries[key] = (result, regions)
+        for region in regions:
+            self.by_region.setdefault(region, set()).add(key)
+        if len(self.entries) > self.maxsize:
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+        return result
+
+    def discard(self, key):
+        """
+        Removes one entry (if present) together with its region links.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for region in entry[1]:
+            keys = self.by_region.get(region)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_region[region]
+
+    def invalidate(self, regions):
+        """
+        Drops every entry whose result touches one of the regions. Returns how many were dropped.
+        """
+        stale = set()
+        for region in regions:
+            stale.update(self.by_region.get(region, ()))
+        for key in stale:
+            self.discard(key)
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """
+        Drops all entries; the counters are kept.
+        """
+        self.entries.clear()
+        self.by_region.clear()
+
+    def stats(self):
+        """
+        Returns the counters and the current size as a dict.
+        """
+        return dict(size=len(self.entries), maxsize=self.maxsize, hits=self.hits, misses=self.misses,
+                    evictions=self.evictions, invalidations=self.invalidations)
+
+
+def cached_compute_visibility(cache, grid, observer, version=0, visibility_range=None):
+    """
+    compute_visibility through the cache, keyed by (version, observer cell, range).
+    Returns (visible_cells, visible_walls) as (n, 2) int32 arrays. The entry depends on
+    every cell the query read (see compute_visibility's touched), which besides the
+    visible cells and walls includes the cells its line-of-sight walks crossed, so
+    invalidate it with the edited cells.
+    """
+    observer = (int(observer[0]), int(observer[1]))
+
+    def compute():
+        touched = set()
+        visible_cells, visible_walls = compute_visibility(grid, observer, visibility_range=visibility_range,
+                                                          touched=touched)
+        result = (np.array(sorted(visible_cells), dtype=np.int32).reshape(-1, 2),
+                  np.array(sorted(visible_walls), dtype=np.int32).reshape(-1, 2))
+        return result, touched
+
+    return cache.get(('cells', version, observer, visibility_range), compute)
+
+
+def cached_tiled_visibility(cache, tiled_mesh, observer, version=0, visibility_range=None):
+    """
+    triangular_expansion_cdt on a TiledGridMesh through the cache, keyed by
+    (version, observer cell, range). The expansion runs from the center of the
+    observer's cell, so every position in a cell shares one entry. Returns the visible
+    triangle indices as an int32 array. The entry depends on the observer's tile and the
+    tiles of the visible triangles and their neighbors, which include the walls and
+    out-of-range edges that bound the view, so invalidate it with the tiles returned by
+    TiledGridMesh.update_cells.
+    """
+    cell_size = tiled_mesh.cell_size
+    cell = (int(observer[0] // cell_size), int(observer[1] // cell_size))
+
+    def compute():
+        center = ((cell[0] + 0.5) * cell_size, (cell[1] + 0.5) * cell_size)
+        # The center lies on the cell's diagonal, and the triangle it is located in decides
+        # which side the expansion nudges it to, so locate it without the previous walk
+        tiled_mesh.locator.last_triangle = None
+        visible = np.array(triangular_expansion_cdt(tiled_mesh.mesh, center, visibility_range=visibility_range),
+                           dtype=np.int32)
+        around = tiled_mesh.mesh.neighbors[visible].ravel()
+        tiles = set(np.unique(np.concatenate([visible, around[around >= 0]]) // tiled_mesh.capacity).tolist())
+        width, height = tiled_mesh.grid.shape
+        if 0 <= cell[0] < width and 0 <= cell[1] < height:
+            # Also covers an observer standing in a blocked cell, which sees nothing until it opens
+            tiles.add(tiled_mesh.tile_of_cell(*cell))
+        return visible, tiles
+
+    return cache.get(('tiled', version, cell, visibility_range), compute)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tea package lives next to this directory; make it importable wherever pytest is started
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
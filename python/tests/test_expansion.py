@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from tea import (
+    MAP_STYLES,
+    build_grid_mesh,
+    edge_visibility_expansion,
+    generate_map,
+    los,
+    triangular_expansion_cdt,
+    visibility_polygon,
+)
+
+CELL_SIZE = 10
+
+
+def interior_samples(corners, rng, count=40):
+    """
+    count random points inside every triangle of corners (n, 3, 2), as (n, count, 2).
+    """
+    return np.einsum('tsk,tkd->tsd', rng.dirichlet((1, 1, 1), size=(len(corners), count)), corners)
+
+
+def edge_samples(corners, steps=200):
+    """
+    Points along every edge of the triangles moved a hair inside, as (n, 3 * (steps - 1), 2).
+    A triangle TEA reports can be visible through a thin sliver only, which these catch.
+    """
+    t = np.linspace(0, 1, steps + 1)[1:-1, None]
+    edges = corners[:, :, None, :] + (np.roll(corners, -1, axis=1) - corners)[:, :, None, :] * t
+    centroids = corners.mean(axis=1)[:, None, None, :]
+    return (edges + (centroids - edges) * 1e-4).reshape(len(corners), -1, 2)
+
+
+def any_clear(grid, observer, samples):
+    """
+    For every row of samples (n, k, 2), whether one of its points is in clear grid line of sight.
+    """
+    clear = los.batch_is_visible(observer, samples.reshape(-1, 2), grid, CELL_SIZE)
+    return clear.reshape(len(samples), -1).any(axis=1)
+
+
+def random_observers(grid, rng, count):
+    cells = np.argwhere(grid)
+    chosen = cells[rng.integers(len(cells), size=count)]
+    return ((chosen + rng.uniform(0.05, 0.95, size=(count, 2))) * CELL_SIZE).tolist()
+
+
+def test_tea_matches_grid_line_of_sight():
+    for style in MAP_STYLES:
+        for seed in range(2):
+            grid = generate_map(style, 24, 24, seed=seed)
+            mesh = build_grid_mesh(grid, CELL_SIZE)
+            rng = np.random.default_rng(seed)
+            walkable = np.flatnonzero(mesh.walkable)
+            corners = mesh.vertices[mesh.triangles]
+            samples = interior_samples(corners[walkable], rng)
+            for observer in random_observers(grid, rng, 6):
+                visible = triangular_expansion_cdt(mesh, tuple(observer))
+                assert len(visible) == len(set(visible))
+                # Every triangle with a point in sight is found ...
+                seen = walkable[any_clear(grid, observer, samples)]
+                assert set(seen.tolist()) <= set(visible), (style, seed, observer)
+                # ... and every triangle found has a point in sight
+                assert any_clear(grid, observer, edge_samples(corners[visible])).all(), (style, seed, observer)
+
+
+def test_tea_range_keeps_the_triangles_reaching_into_it():
+    grid = generate_map('rooms', 32, 32, seed=3)
+    mesh = build_grid_mesh(grid, CELL_SIZE)
+    rng = np.random.default_rng(3)
+    corners = mesh.vertices[mesh.triangles]
+    for observer in random_observers(grid, rng, 10):
+        visible = set(triangular_expansion_cdt(mesh, tuple(observer)))
+        ranged = triangular_expansion_cdt(mesh, tuple(observer), visibility_range=60)
+        assert set(ranged) <= visible
+        # Triangles with a corner in range are certainly reached
+        near = np.flatnonzero((np.linalg.norm(corners - observer, axis=2) < 60).any(axis=1))
+        assert visible & set(near.tolist()) <= set(ranged)
+
+
+@pytest.mark.parametrize('cone', [dict(heading=0.5), dict(half_angle=0.5)])
+def test_view_cone_needs_heading_and_half_angle(cone):
+    grid = generate_map('noise', 8, 8, seed=0)
+    mesh = build_grid_mesh(grid, CELL_SIZE)
+    with pytest.raises(ValueError):
+        triangular_expansion_cdt(mesh, (-5.0, -5.0), **cone)
+    with pytest.raises(ValueError):
+        visibility_polygon(mesh, (45.0, 45.0), **cone)
+    with pytest.raises(ValueError):
+        edge_visibility_expansion(mesh, (45.0, 45.0), grid, CELL_SIZE, **cone)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from tea import build_pvs, compute_visibility, generate_map, load_pvs, los
+
+# Sample points per side of a cell for the line-of-sight checks, kept off the cell borders
+SAMPLES = np.linspace(0.02, 0.98, 5)
+
+
+def visibility_matrix(pvs):
+    cells = pvs.shape[0] * pvs.shape[1]
+    return np.unpackbits(pvs.bits.view(np.uint8), axis=1, bitorder='little')[:, :cells].astype(bool)
+
+
+def cell_points(cells, rng):
+    """
+    The sample grid plus a few random points of every cell, in cell units, as (n, k, 2).
+    """
+    lattice = np.stack(np.meshgrid(SAMPLES, SAMPLES, indexing='ij'), axis=-1).reshape(-1, 2)
+    offsets = np.concatenate([lattice, rng.uniform(0, 1, (4, 2))])
+    return np.asarray(cells, dtype=np.float64)[:, None, :] + offsets[None]
+
+
+def test_pvs_is_conservative(tmp_path):
+    rng = np.random.default_rng(0)
+    for seed, style in enumerate(('noise', 'cave')):
+        grid = generate_map(style, 10, 8, seed=seed)
+        pvs = build_pvs(grid, str(tmp_path / style), workers=1)
+        matrix = visibility_matrix(pvs)
+        cells = np.argwhere(grid)
+        points = cell_points(cells, rng)
+        rows = cells[:, 0] * grid.shape[1] + cells[:, 1]
+        for source, source_points in zip(rows.tolist(), points):
+            hidden = ~matrix[source, rows]
+            if not hidden.any():
+                continue
+            targets = points[hidden].reshape(-1, 2)
+            for origin in source_points:
+                assert not los.batch_is_visible(origin, targets, grid, 1).any()
+
+
+def test_pvs_holds_center_visibility_and_is_symmetric(tmp_path):
+    grid = generate_map('rooms', 16, 12, seed=1)
+    pvs = build_pvs(grid, str(tmp_path), workers=1)
+    matrix = visibility_matrix(pvs)
+    assert (matrix == matrix.T).all()
+    assert not matrix[:, ~grid.reshape(-1)].any()
+    for source in map(tuple, np.argwhere(grid)):
+        visible_cells, _ = compute_visibility(grid, source)
+        assert all(pvs.is_visible(source, target) for target in visible_cells)
+    # Cells given as NumPy integers, as np.argwhere returns them, address the same bits
+    for source, target in zip(np.argwhere(grid)[::7], np.argwhere(grid)[::-7]):
+        assert pvs.is_visible(source, target) == pvs.is_visible(tuple(source.tolist()), tuple(target.tolist()))
+
+
+def test_build_pvs_resumes_an_interrupted_build(tmp_path):
+    grid = generate_map('noise', 14, 9, seed=2)
+    expected = np.array(build_pvs(grid, str(tmp_path / 'full'), workers=1).bits)
+
+    path = str(tmp_path / 'partial')
+    build_pvs(grid, path, workers=1)
+    # Pretend the build stopped after the first rows were flushed
+    bits = np.load(f'{path}/bits.npy', mmap_mode='r+')
+    done = np.load(f'{path}/done.npy', mmap_mode='r+')
+    bits[40:] = 0
+    done[40:] = False
+    bits.flush()
+    done.flush()
+    del bits, done
+    with pytest.raises(ValueError):
+        load_pvs(path)
+
+    assert (np.array(build_pvs(grid, path, workers=2, chunk_size=16).bits) == expected).all()
+    assert (np.array(load_pvs(path).bits) == expected).all()
+
+
+def test_build_pvs_refuses_a_different_grid(tmp_path):
+    grid = generate_map('noise', 10, 10, seed=3)
+    build_pvs(grid, str(tmp_path), workers=1)
+    other = grid.copy()
+    other[0, 0] = not other[0, 0]
+    with pytest.raises(ValueError):
+        build_pvs(other, str(tmp_path), workers=1)
+    with pytest.raises(ValueError):
+        build_pvs(grid[:, :9], str(tmp_path), workers=1)
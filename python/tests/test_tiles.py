@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+
+from tea import TiledGridMesh, generate_map
+
+
+@pytest.mark.parametrize('cell', [(-1, 3), (3, -1), (20, 0), (0, 20)])
+def test_update_cells_rejects_cells_outside_the_grid(cell):
+    tiled = TiledGridMesh(generate_map('noise', 20, 20, seed=0), 10, tile_size=8)
+    grid, neighbors = tiled.grid.copy(), tiled.mesh.neighbors.copy()
+    with pytest.raises(ValueError):
+        tiled.update_cells([((2, 2), not grid[2, 2]), (cell, False)])
+    # Nothing is applied, not even the valid change before the bad one
+    assert (tiled.grid == grid).all()
+    assert (tiled.mesh.neighbors == neighbors).all()
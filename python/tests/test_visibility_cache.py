@@ -0,0 +1,65 @@
+import numpy as np
+
+from tea import (
+    VisibilityCache,
+    TiledGridMesh,
+    cached_compute_visibility,
+    cached_tiled_visibility,
+    compute_visibility,
+    generate_map,
+    triangular_expansion_cdt,
+)
+
+
+def as_pairs(cells):
+    return sorted(tuple(int(c) for c in cell) for cell in cells)
+
+
+def test_cached_compute_visibility_matches_recompute_under_toggles():
+    rng = np.random.default_rng(0)
+    for seed in range(4):
+        grid = generate_map('noise', 12, 12, seed=seed, density=0.3)
+        cache = VisibilityCache(maxsize=64)
+        for step in range(600):
+            if step % 3 == 0:
+                cell = tuple(rng.integers(0, 12, 2).tolist())
+                grid[cell] = not grid[cell]
+                cache.invalidate([cell])
+            observer = tuple(rng.integers(0, 12, 2).tolist())
+            visibility_range = (None, 4)[step % 2]
+            visible_cells, visible_walls = cached_compute_visibility(cache, grid, observer,
+                                                                     visibility_range=visibility_range)
+            expected_cells, expected_walls = compute_visibility(grid, observer, visibility_range=visibility_range)
+            assert as_pairs(visible_cells) == as_pairs(expected_cells)
+            assert as_pairs(visible_walls) == as_pairs(expected_walls)
+        assert cache.hits > 0 and cache.invalidations > 0
+
+
+def test_cached_compute_visibility_keys_by_range():
+    grid = np.ones((10, 10), dtype=bool)
+    cache = VisibilityCache()
+    near, _ = cached_compute_visibility(cache, grid, (5, 5), visibility_range=2)
+    far, _ = cached_compute_visibility(cache, grid, (5, 5))
+    assert len(near) < len(far) == 100
+    assert cache.misses == 2
+
+
+def test_cached_tiled_visibility_matches_recompute_under_toggles():
+    rng = np.random.default_rng(1)
+    grid = generate_map('noise', 24, 24, seed=1, density=0.25)
+    tiled = TiledGridMesh(grid, 10, tile_size=8)
+    cache = VisibilityCache(maxsize=64)
+    for step in range(300):
+        if step % 4 == 0:
+            cell = tuple(rng.integers(0, 24, 2).tolist())
+            cache.invalidate(tiled.update_cells({cell: not tiled.grid[cell]}))
+        cell = rng.integers(0, 24, 2)
+        observer = tuple(((cell + rng.uniform(0, 1, 2)) * 10).tolist())
+        visibility_range = (None, 60)[step % 2]
+        cached = cached_tiled_visibility(cache, tiled, observer, visibility_range=visibility_range)
+        # Like the cached computation, locate the center without the previous walk
+        tiled.locator.last_triangle = None
+        center = tuple(((cell + 0.5) * 10).tolist())
+        assert sorted(cached.tolist()) == sorted(triangular_expansion_cdt(tiled.mesh, center,
+                                                                          visibility_range=visibility_range))
+    assert cache.hits > 0 and cache.invalidations > 0